@@ -0,0 +1,450 @@
+"""
+Helpers for invoking the glato CLI from end-to-end tests.
+
+Shared by the test modules and by the session-scoped fixtures in conftest.py
+so that expensive enumerations can be run once and reused.
+"""
+
+import asyncio
+import contextlib
+import functools
+import io
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from unittest import mock
+
+import pytest
+from requests.adapters import HTTPAdapter
+
+
+# Exit code reported when glato does not finish within the timeout
+TIMEOUT_RETURNCODE = 124
+
+# Labels every full token enumeration prints, lowercased
+TOKEN_INFO_FIELDS = frozenset({"username:", "user id:", "email:", "scopes:", "token name:"})
+
+# Environment captured once at import; per-call envs are derived from it
+_BASE_ENV = dict(os.environ)
+
+# Per-token environments, built on first use and shared by later calls
+_ENV_CACHE = {}
+
+# Popen arguments for every glato launch. With an absolute executable and
+# close_fds=False CPython starts the child with posix_spawn() instead of
+# fork()+exec(), and skips closing every inherited descriptor first. The
+# tests hold no descriptors the child must not see; tokens travel in env.
+_SPAWN_KWARGS = {
+    "executable": shutil.which("glato", path=_BASE_ENV.get("PATH")),
+    "close_fds": False,
+}
+
+
+def glato_env(token=None):
+    """Return the environment for a glato subprocess using ``token``.
+
+    The returned dict is shared between calls and must not be modified.
+    """
+    if not token:
+        return _BASE_ENV
+    env = _ENV_CACHE.get(token)
+    if env is None:
+        env = _ENV_CACHE[token] = {**_BASE_ENV, "GL_TOKEN": token}
+    return env
+
+
+class GlatoResult:
+    """A finished glato run whose lowercased output is computed on first use.
+
+    Attribute access falls through to the wrapped CompletedProcess, so
+    ``returncode``, ``stdout`` and ``stderr`` work as before.
+    """
+
+    def __init__(self, completed):
+        self.completed = completed
+
+    def __getattr__(self, name):
+        return getattr(self.completed, name)
+
+    @functools.cached_property
+    def lower_stdout(self):
+        return self.completed.stdout.lower()
+
+
+class GlatoProcess:
+    """A glato command started in the background by start_glato()."""
+
+    def __init__(self, args, token=None):
+        self.cmd = ["glato"]
+        self.cmd.extend(args)
+        # Output goes to temp files rather than pipes: memory stays flat
+        # while glato runs, and several processes can run at once without
+        # stalling on a full pipe buffer
+        self._stdout = tempfile.TemporaryFile(mode="w+")
+        self._stderr = tempfile.TemporaryFile(mode="w+")
+        self.proc = subprocess.Popen(
+            self.cmd,
+            env=glato_env(token),
+            stdout=self._stdout,
+            stderr=self._stderr,
+            text=True,
+            **_SPAWN_KWARGS
+        )
+
+    def wait(self, timeout=None):
+        """Wait for the command and return a GlatoResult.
+
+        On timeout the command is killed and returncode 124 is reported.
+        """
+        try:
+            returncode = self.proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+            returncode = TIMEOUT_RETURNCODE
+
+        outputs = []
+        for stream in (self._stdout, self._stderr):
+            stream.seek(0)
+            outputs.append(stream.read())
+            stream.close()
+        stdout, stderr = outputs
+        if returncode == TIMEOUT_RETURNCODE:
+            stderr = stderr or "Command timed out"
+        return GlatoResult(subprocess.CompletedProcess(self.cmd, returncode, stdout, stderr))
+
+
+@functools.lru_cache(maxsize=None)
+def _needles_re(needles):
+    return re.compile("|".join(map(re.escape, needles)), re.IGNORECASE)
+
+
+def contains_any(text, *needles):
+    """Return True if ``text`` contains any of ``needles``, ignoring case.
+
+    Matches without building a lowercased copy of ``text``.
+    """
+    return _needles_re(needles).search(text) is not None
+
+
+@functools.lru_cache(maxsize=None)
+def _overlapping_re(needles):
+    # A lookahead reports every start position, so needles that overlap in
+    # the text are all found
+    return re.compile("(?=(" + "|".join(map(re.escape, needles)) + "))")
+
+
+def missing_from(output, expected):
+    """Return the strings in frozenset ``expected`` that do not occur in ``output``, in one scan."""
+    return expected - set(_overlapping_re(expected).findall(output))
+
+
+def start_glato(args, token=None):
+    """Start glato without waiting for it; collect with ``.wait(timeout)``."""
+    return GlatoProcess(args, token=token)
+
+
+def run_glato(args, token=None, timeout=None):
+    """Run glato command with proper environment setup.
+
+    When ``timeout`` expires the command is killed and a result with
+    returncode 124 is returned, carrying whatever output was produced.
+    """
+    return start_glato(args, token=token).wait(timeout=timeout)
+
+
+def run_glato_with_timeout(args, token=None, timeout=30):
+    """Run glato command with timeout."""
+    return run_glato(args, token=token, timeout=timeout)
+
+
+def wait_all(processes, timeout):
+    """Wait for started glato processes sharing one overall deadline.
+
+    ``processes`` maps keys to GlatoProcess objects; the results come back
+    under the same keys.
+    """
+    deadline = time.monotonic() + timeout
+    return {
+        key: process.wait(timeout=max(0, deadline - time.monotonic()))
+        for key, process in processes.items()
+    }
+
+
+@dataclass(frozen=True)
+class StreamResult:
+    """Outcome of run_glato_stream(): exit code and the pattern keys seen."""
+    returncode: int
+    found: frozenset
+
+
+def run_glato_stream(args, token=None, patterns=None, timeout=300):
+    """Run glato and report which ``patterns`` occur in its stdout.
+
+    ``patterns`` maps keys to regexes (strings or compiled). stdout is read
+    line by line and never kept; once every pattern has matched, the rest
+    is discarded unscanned while glato runs to completion. On timeout the
+    command is killed and returncode 124 is reported.
+    """
+    cmd = ["glato"]
+    cmd.extend(args)
+    pending = {key: re.compile(regex) for key, regex in (patterns or {}).items()}
+    found = set()
+
+    proc = subprocess.Popen(
+        cmd,
+        env=glato_env(token),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        bufsize=1,
+        **_SPAWN_KWARGS
+    )
+    timed_out = threading.Event()
+
+    def _kill():
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(timeout, _kill)
+    timer.start()
+    try:
+        with proc.stdout:
+            for line in proc.stdout:
+                if not pending:
+                    continue
+                for key, regex in list(pending.items()):
+                    if regex.search(line):
+                        found.add(key)
+                        del pending[key]
+        returncode = proc.wait()
+    finally:
+        timer.cancel()
+
+    if timed_out.is_set():
+        returncode = TIMEOUT_RETURNCODE
+    return StreamResult(returncode, frozenset(found))
+
+
+async def run_glato_async(args, token=None, timeout=None):
+    """Run glato as an asyncio subprocess; same result shape as run_glato()."""
+    cmd = ["glato"]
+    cmd.extend(args)
+
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        env=glato_env(token),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        **_SPAWN_KWARGS
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return GlatoResult(subprocess.CompletedProcess(cmd, TIMEOUT_RETURNCODE, "", "Command timed out"))
+
+    return GlatoResult(subprocess.CompletedProcess(
+        cmd, proc.returncode, stdout.decode(), stderr.decode()
+    ))
+
+
+def run_glato_batch(calls, timeout=None):
+    """Run independent glato invocations concurrently.
+
+    ``calls`` maps keys to ``(args, token)`` pairs; the results come back
+    under the same keys once every invocation has finished.
+    """
+    async def _gather():
+        results = await asyncio.gather(*(
+            run_glato_async(args, token=token, timeout=timeout)
+            for args, token in calls.values()
+        ))
+        return dict(zip(calls, results))
+
+    return asyncio.run(_gather())
+
+
+class _InprocTimeout(BaseException):
+    """Raised by SIGALRM to stop an in-process run.
+
+    A BaseException so glato's ``except Exception`` handlers cannot swallow it.
+    """
+
+
+def _raise_inproc_timeout(signum, frame):
+    raise _InprocTimeout()
+
+
+class LineCounter(io.TextIOBase):
+    """A write-only text stream that counts lines starting with ``prefix``.
+
+    Output is examined as it is written and then dropped, so even a very
+    large run is never held in memory.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.count = 0
+        self._partial = ""
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        *complete, self._partial = (self._partial + text).split("\n")
+        self.count += sum(line.startswith(self.prefix) for line in complete)
+        return len(text)
+
+
+# Connection pool shared by the glato API clients of in-process runs
+_SHARED_ADAPTER = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+
+
+@contextlib.contextmanager
+def _shared_http_pool():
+    """Mount the shared connection pool on every glato Api built inside the block.
+
+    Each Api still gets its own requests.Session, so cookies and headers
+    stay per token; only the adapter that holds the keep-alive connections
+    is shared, letting later in-process runs skip the TCP and TLS
+    handshakes. The real constructor runs unchanged first, and the patch is
+    undone when the block exits, so Api objects built outside in-process
+    runs are left alone.
+    """
+    from glato.gitlab.api import Api
+
+    original_init = Api.__init__
+
+    @functools.wraps(original_init)
+    def _init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        self.session.mount("https://", _SHARED_ADAPTER)
+        self.session.mount("http://", _SHARED_ADAPTER)
+
+    with mock.patch.object(Api, "__init__", _init):
+        yield
+
+
+def run_glato_inproc(args, token=None, timeout=None, stdout=None):
+    """Run glato's CLI in this interpreter and capture its output.
+
+    Avoids spawning a new Python process per call. ``timeout`` is enforced
+    with SIGALRM, so like run_glato() a run that overruns reports returncode
+    124 with the output produced so far. Signals only reach the main thread;
+    elsewhere a timed call falls back to run_glato().
+
+    If ``stdout`` is a writable text stream, output is written there instead
+    of being captured, and the result's ``stdout`` is empty.
+    """
+    if timeout is not None and threading.current_thread() is not threading.main_thread():
+        result = run_glato(args, token=token, timeout=timeout)
+        if stdout is not None:
+            stdout.write(result.stdout)
+            result.completed.stdout = ""
+        return result
+
+    from glato.cli import cli
+
+    cmd = ["glato"]
+    cmd.extend(args)
+
+    captured = stdout is None
+    if captured:
+        stdout = io.StringIO()
+    stderr = io.StringIO()
+    old_token = os.environ.get("GL_TOKEN")
+    old_stdin = sys.stdin
+    if token:
+        os.environ["GL_TOKEN"] = token
+    else:
+        os.environ.pop("GL_TOKEN", None)
+    # Answer the interactive token prompt with an empty line
+    sys.stdin = io.StringIO("\n")
+    old_handler = None
+    if timeout is not None:
+        old_handler = signal.signal(signal.SIGALRM, _raise_inproc_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr), \
+                _shared_http_pool():
+            returncode = cli(list(args))
+    except SystemExit as e:
+        # argparse exits on usage errors and --help
+        returncode = e.code if isinstance(e.code, int) else 1
+    except _InprocTimeout:
+        returncode = TIMEOUT_RETURNCODE
+    except Exception:
+        # As in a subprocess, an uncaught error exits 1 with its traceback
+        stderr.write(traceback.format_exc())
+        returncode = 1
+    finally:
+        if timeout is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old_handler)
+        sys.stdin = old_stdin
+        if old_token is None:
+            os.environ.pop("GL_TOKEN", None)
+        else:
+            os.environ["GL_TOKEN"] = old_token
+
+    stderr = stderr.getvalue()
+    if returncode == TIMEOUT_RETURNCODE:
+        stderr = stderr or "Command timed out"
+    return GlatoResult(subprocess.CompletedProcess(
+        cmd, returncode or 0, stdout.getvalue() if captured else "", stderr
+    ))
+
+
+def run_glato_checked(args, token=None, timeout=300, expect_success=True):
+    """Run glato in-process, failing the test if it exits non-zero.
+
+    The default 5 minute timeout allows for slow API responses; a run that
+    overruns reports returncode 124. Pass ``expect_success=False`` to get a
+    failed run back instead.
+    """
+    result = run_glato_inproc(args, token=token, timeout=timeout)
+
+    if expect_success and result.returncode != 0:
+        pytest.fail(f"Command failed with exit code {result.returncode}:\n{result.stderr}")
+
+    return result
+
+
+@dataclass(frozen=True)
+class ProjectRecord:
+    """One project block from ``--enumerate-projects`` output."""
+    path: str
+    archived: bool
+    fields: dict = field(default_factory=dict, compare=False)
+
+
+def parse_projects(output):
+    """Parse the project blocks in glato output into ProjectRecords.
+
+    glato has no machine-readable output mode, so this reads the
+    ``Project: <path> [ARCHIVED]`` header and the ``Key: value`` lines
+    that follow it.
+    """
+    projects = []
+    for block in ("\n" + output).split("\nProject: ")[1:]:
+        header, _, body = block.partition("\n")
+        path, tag, _ = header.partition(" [ARCHIVED]")
+        fields = {}
+        for line in body.split("\n"):
+            if not line or line.startswith("Project Summary:"):
+                break
+            key, sep, value = line.partition(": ")
+            if sep:
+                fields.setdefault(key, value)
+        projects.append(ProjectRecord(path.strip(), bool(tag), fields))
+    return projects
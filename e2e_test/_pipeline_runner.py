@@ -0,0 +1,224 @@
+"""
+Helpers for the runner tests that drive real pipelines through the GitLab API.
+
+Shared by the SaaS and self-hosted runner suites, which differ only in how
+they authenticate, whether they verify TLS and how much of a job trace they
+fetch.
+"""
+
+import random
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# Pipeline statuses after which a pipeline will not change any more
+TERMINAL_PIPELINE_STATUSES = frozenset({"success", "failed", "canceled", "skipped"})
+
+
+def retrying_session(verify, headers=None):
+    """Return an HTTP session whose connections to GitLab are kept alive.
+
+    Transient errors and rate limiting (429, honouring Retry-After) are
+    retried with backoff. ``verify`` is passed on to requests as is.
+    """
+    retry = Retry(total=5, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.verify = verify
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+def get_ci_commit_base(session, project_url):
+    """Return the branch test commits start from and how they write the CI file.
+
+    That is the project's default branch, and whether .gitlab-ci.yml
+    already exists there ("update") or not ("create").
+    """
+    response = session.get(project_url)
+    assert response.status_code == 200, f"Failed to get project: {response.status_code}"
+    default_branch = response.json()["default_branch"]
+
+    response = session.head(
+        f"{project_url}/repository/files/.gitlab-ci.yml",
+        params={"ref": default_branch}
+    )
+    return default_branch, "update" if response.status_code == 200 else "create"
+
+
+class PipelineRunnerMixin:
+    """Create test pipelines on a throwaway branch, wait for them and debug failures.
+
+    The test class sets ``session``, ``gitlab_url``, ``project_id``,
+    ``default_branch``, ``ci_file_action``, ``test_id`` and an empty
+    ``_pipeline_jobs`` dict in its setup, and implements ``_get_job_trace``.
+    """
+
+    def _create_and_wait_for_pipeline(self, config: str, commit_message: str, timeout: int = 120) -> int:
+        """Create a pipeline and wait for completion."""
+        print(f"📝 Creating pipeline: {commit_message}")
+
+        branch_name = f"test-runner-{self.test_id}-{int(time.time())}"
+        branch_created = False
+
+        try:
+            # Create a unique branch from the default branch with the CI
+            # config committed to it, in a single API call
+            response = self.session.post(
+                f"{self.gitlab_url}/api/v4/projects/{self.project_id}/repository/commits",
+                json={
+                    "branch": branch_name,
+                    "start_branch": self.default_branch,
+                    "commit_message": commit_message,
+                    "actions": [{
+                        "action": self.ci_file_action,
+                        "file_path": ".gitlab-ci.yml",
+                        "content": config
+                    }]
+                }
+            )
+            assert response.status_code == 201, \
+                f"Failed to create test commit: {response.status_code} {response.text}"
+            branch_created = True
+
+            # Get the pipeline ID as soon as GitLab has created the pipeline
+            pipelines = self._poll_until(
+                f"{self.gitlab_url}/api/v4/projects/{self.project_id}/pipelines",
+                bool,
+                params={"ref": branch_name, "per_page": 1},
+                initial=0.5, cap=0.5, timeout=10
+            )
+            assert pipelines, "No pipeline found"
+
+            pipeline_id = pipelines[0]["id"]
+            print(f"📋 Pipeline created: {pipeline_id}")
+
+            # Wait for pipeline completion, reporting each status once
+            seen_statuses = set()
+
+            def finished(pipeline):
+                status = pipeline["status"]
+                if status not in seen_statuses:
+                    seen_statuses.add(status)
+                    print(f"🔄 Pipeline {pipeline_id} status: {status}")
+                return status in TERMINAL_PIPELINE_STATUSES
+
+            pipeline = self._poll_until(
+                f"{self.gitlab_url}/api/v4/projects/{self.project_id}/pipelines/{pipeline_id}",
+                finished,
+                timeout=timeout
+            )
+            if pipeline is None:
+                raise TimeoutError(f"Pipeline {pipeline_id} did not complete within {timeout} seconds")
+
+            if pipeline["status"] != "success":
+                self._debug_failed_pipeline(pipeline_id)
+            return pipeline_id
+
+        finally:
+            self._pipeline_finished(branch_name if branch_created else None)
+
+    def _pipeline_finished(self, branch_name):
+        """Clean up after a test pipeline; ``branch_name`` is None if no branch was created."""
+        if branch_name:
+            self._delete_remote_branch(branch_name)
+
+    def _delete_remote_branch(self, branch_name: str):
+        """Delete a test branch through the API, warning on failure."""
+        try:
+            response = self.session.delete(
+                f"{self.gitlab_url}/api/v4/projects/{self.project_id}/repository/branches/"
+                f"{urllib.parse.quote(branch_name, safe='')}"
+            )
+            if response.status_code not in (204, 404):
+                print(f"⚠️ Cleanup warning: deleting {branch_name} returned {response.status_code}")
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Cleanup warning: {e}")
+
+    def _poll_until(self, url: str, predicate, params: dict = None,
+                    initial: float = 1, cap: float = 15, timeout: float = 120):
+        """GET ``url`` until ``predicate`` accepts its JSON body.
+
+        The wait between polls starts at ``initial`` seconds and doubles up
+        to ``cap``, with up to 20% random jitter. Returns the accepted body,
+        or None once ``timeout`` seconds have passed.
+
+        Repeat polls send the last ETag in If-None-Match; when GitLab answers
+        304 Not Modified the previous body is reused instead of re-parsed.
+        """
+        deadline = time.monotonic() + timeout
+        delay = initial
+        etag = data = None
+        while True:
+            headers = {"If-None-Match": etag} if etag else None
+            response = self.session.get(url, params=params, headers=headers)
+            if response.status_code != 304 or data is None:
+                assert response.status_code == 200, f"Failed to poll {url}: {response.status_code}"
+                data = response.json()
+                etag = response.headers.get("ETag")
+
+            if predicate(data):
+                return data
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(delay + random.uniform(0, delay * 0.2), remaining))
+            delay = min(delay * 2, cap)
+
+    def _get_pipeline_jobs(self, pipeline_id: int) -> list:
+        """Get jobs for a finished pipeline.
+
+        Only called once a pipeline has finished, so the jobs are fetched
+        once and reused by both the failure debugging and the test.
+        """
+        jobs = self._pipeline_jobs.get(pipeline_id)
+        if jobs is None:
+            response = self.session.get(
+                f"{self.gitlab_url}/api/v4/projects/{self.project_id}/pipelines/{pipeline_id}/jobs"
+            )
+            assert response.status_code == 200, f"Failed to get pipeline jobs: {response.status_code}"
+            jobs = self._pipeline_jobs[pipeline_id] = response.json()
+        return jobs
+
+    def _debug_failed_job(self, job, trace=None):
+        """Debug a failed job, reusing an already fetched trace."""
+        print(f"🔍 Debugging failed job {job['id']}: {job['name']}")
+
+        # Get job trace
+        status_code, text = trace or self._get_job_trace(job)
+        if status_code in (200, 206):
+            print(f"📋 Job trace:\n{text}")
+        else:
+            print(f"❌ Could not get job trace: {status_code}")
+
+    def _debug_failed_jobs(self, jobs):
+        """Debug several unsuccessful jobs, fetching their traces concurrently.
+
+        Only jobs that actually failed have a trace worth reading; canceled
+        and skipped jobs are left out. The traces are printed in job order
+        once all have arrived, so the output of different jobs does not
+        interleave.
+        """
+        jobs = [job for job in jobs if job["status"] == "failed"]
+        if not jobs:
+            return
+        with ThreadPoolExecutor(max_workers=min(8, len(jobs))) as executor:
+            traces = list(executor.map(self._get_job_trace, jobs))
+        for job, trace in zip(jobs, traces):
+            self._debug_failed_job(job, trace)
+
+    def _debug_failed_pipeline(self, pipeline_id):
+        """Debug a failed pipeline."""
+        print(f"🔍 Debugging failed pipeline {pipeline_id}")
+
+        jobs = self._get_pipeline_jobs(pipeline_id)
+        self._debug_failed_jobs([job for job in jobs if job["status"] != "success"])
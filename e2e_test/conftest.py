@@ -3,11 +3,102 @@ Configuration for end-to-end tests using pytest.
 This file provides fixtures and configuration for testing against a real GitLab instance.
 """
 
+import functools
+import hashlib
 import os
+import re
 import pytest
 import subprocess
 import json
+import time
 from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
+
+from glato.enumerate.enumerate import is_saas_url
+
+from ._glato_runner import (
+    TIMEOUT_RETURNCODE, GlatoResult, parse_projects, run_glato_inproc, start_glato, wait_all
+)
+
+
+# export NAME=value, with the value optionally wrapped in single or double quotes
+_EXPORT_RE = re.compile(
+    r'^\s*export\s+([A-Za-z0-9_]+)=(?:"([^"]*)"|\'([^\']*)\'|(.*?))\s*$'
+)
+
+
+# Token variables that may also be supplied through the environment
+_TOKEN_ENV_NAMES = (
+    # Self-hosted tokens (standardized names)
+    'SELF_HOSTED_ALICE_TOKEN',
+    'SELF_HOSTED_BOB_TOKEN',
+    'SELF_HOSTED_IRENE_TOKEN',
+    'SELF_HOSTED_ADMIN_TOKEN',
+
+    # SaaS tokens (standardized names)
+    'SAAS_ALICE_TOKEN',
+    'SAAS_BOB_TOKEN',
+    'SAAS_IRENE_TOKEN',
+    'SAAS_ADMIN_TOKEN',
+
+    # Additional specialized roles (if needed)
+    'SELF_HOSTED_CAROL_TOKEN',
+    'SELF_HOSTED_DAVE_TOKEN',
+    'SELF_HOSTED_EVE_TOKEN',
+    'SELF_HOSTED_FRANK_TOKEN',
+    'SELF_HOSTED_GRACE_TOKEN',
+    'SELF_HOSTED_HENRY_TOKEN',
+)
+
+
+def _read_tokens_file(path):
+    """Parse ``export NAME=value`` lines from a tokens file."""
+    tokens = {}
+    token_path = Path(path)
+    if not token_path.exists():
+        return tokens
+
+    try:
+        lines = token_path.read_text().splitlines()
+    except Exception as e:
+        print(f"Warning: Failed to read tokens file {path}: {e}")
+        return tokens
+
+    for line in lines:
+        match = _EXPORT_RE.match(line)
+        if match:
+            name, double_quoted, single_quoted, bare = match.groups()
+            tokens[name] = next(v for v in (double_quoted, single_quoted, bare) if v is not None)
+    return tokens
+
+
+@functools.lru_cache(maxsize=None)
+def _load_tokens(path: str) -> Mapping[str, str]:
+    """Return the tokens from ``path`` overlaid with the environment, once per path.
+
+    The environment is snapshotted on the first call, so later changes to
+    os.environ during the session are ignored.
+    """
+    tokens = _read_tokens_file(path)
+    for env_name in _TOKEN_ENV_NAMES:
+        if env_name in os.environ:
+            tokens[env_name] = os.environ[env_name]
+    return MappingProxyType(tokens)
+
+
+# Per-environment defaults, selected with GLATO_TEST_ENV=selfhosted|saas
+_TEST_ENV_DEFAULTS = {
+    "selfhosted": {
+        "tokens_file": "terraform-self-hosted/gitlab_tokens.env",
+        "test_project_path_saas": "engineering-glato/eng-repo-glato",
+    },
+    "saas": {
+        "tokens_file": "terraform-gitlab-saas/gitlab_tokens.env",
+        "test_project_path_saas": "acme-corporation-glato/product-glato/api-glato/api-service-glato",
+    },
+}
+_TEST_ENV = os.environ.get("GLATO_TEST_ENV", "selfhosted")
 
 
 def pytest_addoption(parser):
@@ -19,9 +110,82 @@ def pytest_addoption(parser):
     )
     parser.addoption(
         "--tokens-file", 
-        default=os.environ.get("GLATO_TEST_TOKENS_FILE", "terraform-self-hosted/gitlab_tokens.env"),
+        default=os.environ.get("GLATO_TEST_TOKENS_FILE",
+                               _TEST_ENV_DEFAULTS.get(_TEST_ENV, {}).get("tokens_file")),
         help="Path to the file containing GitLab test tokens"
     )
+    parser.addoption(
+        "--glato-cache-ttl",
+        type=int,
+        default=int(os.environ.get("GLATO_TEST_CACHE_TTL", "0")),
+        help="Reuse successful read-only enumerations from earlier runs for this many "
+             "seconds (default: 0, always run glato)"
+    )
+
+
+def pytest_configure(config):
+    """Validate GLATO_TEST_ENV and register the markers used by the end-to-end suite."""
+    if _TEST_ENV not in _TEST_ENV_DEFAULTS:
+        raise pytest.UsageError(
+            f"GLATO_TEST_ENV must be one of {', '.join(_TEST_ENV_DEFAULTS)}, got {_TEST_ENV!r}")
+    config.addinivalue_line("markers", "saas: test runs against GitLab SaaS")
+    config.addinivalue_line("markers", "selfhosted: test runs against a self-hosted GitLab instance")
+    config.addinivalue_line("markers", "slow: network-heavy test that runs pipelines or repeated enumerations")
+    config.addinivalue_line("markers", "no_cache: glato_runner runs glato afresh instead of reusing session output")
+    # Normally registered by pytest-xdist; declared here so runs without it stay quiet
+    config.addinivalue_line("markers", "xdist_group(name): run tests in the same group on one xdist worker")
+
+
+def _is_saas_item(item):
+    """Return True if a collected test targets GitLab SaaS, based on its names."""
+    return (
+        "saas" in item.name.lower() or
+        "saas" in str(item.fspath).lower() or
+        "test_runner_e2e_verification" in str(item.fspath).lower() or  # This file tests SaaS runners
+        (item.cls is not None and "saas" in item.cls.__name__.lower())
+    )
+
+
+def _saas_url(config):
+    """Return the GitLab URL SaaS tests run against."""
+    return (config.getoption("--gitlab-url") or
+            os.environ.get("SAAS_GITLAB_URL", "https://gitlab.com"))
+
+
+def _selfhosted_url(config):
+    """Return the GitLab URL self-hosted tests run against."""
+    return (config.getoption("--gitlab-url") or
+            os.environ.get("SELF_HOSTED_GITLAB_URL") or
+            os.environ.get("GITLAB_URL", "https://gitlab.com"))
+
+
+def pytest_collection_modifyitems(config, items):
+    """Mark the tests that target SaaS and keep each SaaS test class on one xdist worker.
+
+    With ``--dist loadgroup`` the class's tests then share one copy of the
+    session-scoped enumeration fixtures instead of re-running them per worker.
+    Classes that put some of their tests in an ``xdist_group`` of their own
+    keep that grouping and are not pinned as a whole.
+    Tests marked ``selfhosted`` are skipped up front when the self-hosted URL
+    points at GitLab SaaS, and tests marked ``saas`` when the SaaS URL does
+    not, before any of their fixtures are set up.
+    """
+    skip_selfhosted = skip_saas = None
+    if is_saas_url(_selfhosted_url(config)):
+        skip_selfhosted = pytest.mark.skip(reason="Self-hosted test requires self-hosted GitLab environment")
+    if not is_saas_url(_saas_url(config)):
+        skip_saas = pytest.mark.skip(reason="SaaS test requires GitLab SaaS environment")
+    self_grouped = {item.cls for item in items if item.get_closest_marker("xdist_group")}
+    for item in items:
+        item._is_saas = _is_saas_item(item)
+        if item._is_saas and not item.get_closest_marker("saas"):
+            item.add_marker(pytest.mark.saas)
+        if item._is_saas and item.cls is not None and item.cls not in self_grouped:
+            item.add_marker(pytest.mark.xdist_group(item.cls.__name__))
+        if skip_selfhosted and item.get_closest_marker("selfhosted"):
+            item.add_marker(skip_selfhosted)
+        if skip_saas and item.get_closest_marker("saas"):
+            item.add_marker(skip_saas)
 
 
 @pytest.fixture(scope="function")  # Changed from session to function scope
@@ -32,25 +196,26 @@ def gitlab_url(request):
     if explicit_url:
         return explicit_url
     
-    # Auto-detect based on test name/path
-    test_name = request.node.name.lower()
-    test_file = str(request.node.fspath).lower()
-    
-    # Check if this is a SaaS test
-    is_saas_test = (
-        "saas" in test_name or 
-        "saas" in test_file or
-        "test_runner_e2e_verification" in test_file or  # This file tests SaaS runners
-        "saas" in str(request.node.cls).lower() if request.node.cls else False
-    )
-    
-    if is_saas_test:
+    # SaaS detection is done once per test at collection time
+    if getattr(request.node, "_is_saas", False):
         return os.environ.get("SAAS_GITLAB_URL", "https://gitlab.com")
     else:
         return (os.environ.get("SELF_HOSTED_GITLAB_URL") or 
                 os.environ.get("GITLAB_URL", "https://gitlab.com"))
 
 
+@pytest.fixture(scope="session")
+def saas_gitlab_url(request):
+    """Return the GitLab URL used by SaaS tests, for session-scoped fixtures."""
+    return _saas_url(request.config)
+
+
+@pytest.fixture(scope="session")
+def selfhosted_gitlab_url(request):
+    """Return the GitLab URL used by self-hosted tests, for session-scoped fixtures."""
+    return _selfhosted_url(request.config)
+
+
 @pytest.fixture(scope="session")
 def tokens_file(request):
     """Return the path to the tokens file for backward compatibility."""
@@ -61,47 +226,7 @@ def tokens_file(request):
 def tokens(request):
     """Load GitLab tokens from the tokens file or environment variables."""
     tokens_file = request.config.getoption("--tokens-file")
-    tokens = {}
-    
-    # Try to load from file first
-    if Path(tokens_file).exists():
-        try:
-            with open(tokens_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and line.startswith('export ') and '=' in line:
-                        # Extract token name and value from export statements
-                        name, value = line.replace('export ', '', 1).split('=', 1)
-                        tokens[name] = value.strip('"').strip("'")
-        except Exception as e:
-            print(f"Warning: Failed to read tokens file {tokens_file}: {e}")
-    
-    # Fallback to environment variables
-    env_token_names = [
-        # Self-hosted tokens (standardized names)
-        'SELF_HOSTED_ALICE_TOKEN',
-        'SELF_HOSTED_BOB_TOKEN',
-        'SELF_HOSTED_IRENE_TOKEN',
-        'SELF_HOSTED_ADMIN_TOKEN',
-        
-        # SaaS tokens (standardized names)  
-        'SAAS_ALICE_TOKEN',
-        'SAAS_BOB_TOKEN',
-        'SAAS_IRENE_TOKEN',
-        'SAAS_ADMIN_TOKEN',
-        
-        # Additional specialized roles (if needed)
-        'SELF_HOSTED_CAROL_TOKEN',
-        'SELF_HOSTED_DAVE_TOKEN',
-        'SELF_HOSTED_EVE_TOKEN',
-        'SELF_HOSTED_FRANK_TOKEN',
-        'SELF_HOSTED_GRACE_TOKEN',
-        'SELF_HOSTED_HENRY_TOKEN'
-    ]
-    
-    for env_name in env_token_names:
-        if env_name in os.environ:
-            tokens[env_name] = os.environ[env_name]
+    tokens = _load_tokens(tokens_file)
     
     if not tokens:
         print(f"Warning: No tokens found in {tokens_file} or environment variables. Some tests may be skipped.")
@@ -109,122 +234,229 @@ def tokens(request):
     return tokens
 
 
-@pytest.fixture(scope="session")
-def alice_token(tokens):
-    """Return Alice's full API access token for self-hosted testing."""
-    token_name = "SELF_HOSTED_ALICE_TOKEN"
-    if token_name not in tokens:
-        pytest.skip(f"Token {token_name} not found. Please set SELF_HOSTED_ALICE_TOKEN environment variable.")
-    return tokens[token_name]
+# (fixture name, token variable, description) for every per-role token fixture
+_TOKEN_FIXTURES = [
+    ("alice_token", "SELF_HOSTED_ALICE_TOKEN", "Alice's full API access token for self-hosted testing"),
+    ("bob_token", "SELF_HOSTED_BOB_TOKEN", "Bob's read-only API token for self-hosted testing"),
+    ("carol_token", "SELF_HOSTED_CAROL_TOKEN", "Carol's limited access token for self-hosted testing"),
+    ("dave_token", "SELF_HOSTED_DAVE_TOKEN", "Dave's developer access token for self-hosted testing"),
+    ("eve_token", "SELF_HOSTED_EVE_TOKEN", "Eve's product access token for self-hosted testing"),
+    ("frank_token", "SELF_HOSTED_FRANK_TOKEN", "Frank's DevOps access token for self-hosted testing"),
+    ("grace_token", "SELF_HOSTED_GRACE_TOKEN", "Grace's security access token for self-hosted testing"),
+    ("henry_token", "SELF_HOSTED_HENRY_TOKEN", "Henry's finance access token for self-hosted testing"),
+    ("irene_token", "SELF_HOSTED_IRENE_TOKEN", "Irene's executive access token for self-hosted testing"),
+    ("alice_token_saas", "SAAS_ALICE_TOKEN", "Alice's token for SaaS testing"),
+    ("bob_token_saas", "SAAS_BOB_TOKEN", "Bob's token for SaaS testing"),
+    ("irene_token_saas", "SAAS_IRENE_TOKEN", "Irene's token for SaaS testing"),
+]
 
 
-@pytest.fixture(scope="session")
-def bob_token(tokens):
-    """Return Bob's read-only API token for self-hosted testing."""
-    token_name = "SELF_HOSTED_BOB_TOKEN"
-    if token_name not in tokens:
-        pytest.skip(f"Token {token_name} not found. Please set SELF_HOSTED_BOB_TOKEN environment variable.")
-    return tokens[token_name]
+def _xdist_worker_index():
+    """Return this pytest-xdist worker's number (``gw3`` -> 3), or 0 without xdist."""
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "")
+    return int(worker.removeprefix("gw")) if worker.startswith("gw") else 0
 
 
-@pytest.fixture(scope="session")
-def carol_token(tokens):
-    """Return Carol's limited access token for self-hosted testing."""
-    token_name = "SELF_HOSTED_CAROL_TOKEN"
-    if token_name not in tokens:
-        pytest.skip(f"Token {token_name} not found. Please set SELF_HOSTED_CAROL_TOKEN environment variable.")
-    return tokens[token_name]
+def _token_pool(token_name):
+    """Return the equivalent tokens listed in ``<token_name>S``, comma-separated."""
+    return [t.strip() for t in os.environ.get(f"{token_name}S", "").split(",") if t.strip()]
+
+
+def _resolve_token(tokens, token_name):
+    """Return the token to use for ``token_name``, or None if it is unset.
+
+    If a pool of equivalent tokens is set in ``<token_name>S``, each xdist
+    worker takes one from it in turn so parallel workers spread their
+    requests over several accounts' rate limits.
+    """
+    pool = _token_pool(token_name)
+    if pool:
+        return pool[_xdist_worker_index() % len(pool)]
+    return tokens.get(token_name)
+
+
+def _make_token_fixture(name, token_name, description):
+    """Build a session fixture returning ``token_name`` or skipping if unset."""
+    def _token_fixture(tokens):
+        token = _resolve_token(tokens, token_name)
+        if token is None:
+            pytest.skip(f"Token {token_name} not found. Please set {token_name} environment variable.")
+        return token
+
+    _token_fixture.__doc__ = f"Return {description}."
+    return pytest.fixture(scope="session", name=name)(_token_fixture)
+
+
+for _name, _token_name, _description in _TOKEN_FIXTURES:
+    globals()[_name] = _make_token_fixture(_name, _token_name, _description)
 
 
 @pytest.fixture(scope="session")
-def dave_token(tokens):
-    """Return Dave's developer access token for self-hosted testing."""
-    token_name = "SELF_HOSTED_DAVE_TOKEN"
-    if token_name not in tokens:
-        pytest.skip(f"Token {token_name} not found. Please set SELF_HOSTED_DAVE_TOKEN environment variable.")
-    return tokens[token_name]
+def resolve_token(tokens):
+    """Return ``resolve(token_name)`` giving the token to use for a variable, or None.
+
+    Unlike reading ``tokens`` directly this honours ``<token_name>S`` pools.
+    """
+    return functools.partial(_resolve_token, tokens)
 
 
 @pytest.fixture(scope="session")
-def eve_token(tokens):
-    """Return Eve's product access token for self-hosted testing."""
-    token_name = "SELF_HOSTED_EVE_TOKEN"
-    if token_name not in tokens:
-        pytest.skip(f"Token {token_name} not found. Please set SELF_HOSTED_EVE_TOKEN environment variable.")
-    return tokens[token_name]
+def saas_user_tokens(tokens):
+    """Map each SaaS test user to their resolved token, leaving out unset ones."""
+    resolved = {
+        user: _resolve_token(tokens, token_name)
+        for user, token_name in (("alice", "SAAS_ALICE_TOKEN"),
+                                 ("bob", "SAAS_BOB_TOKEN"),
+                                 ("irene", "SAAS_IRENE_TOKEN"))
+    }
+    return MappingProxyType({user: token for user, token in resolved.items() if token is not None})
 
 
 @pytest.fixture(scope="session")
-def frank_token(tokens):
-    """Return Frank's DevOps access token for self-hosted testing."""
-    token_name = "SELF_HOSTED_FRANK_TOKEN"
-    if token_name not in tokens:
-        pytest.skip(f"Token {token_name} not found. Please set SELF_HOSTED_FRANK_TOKEN environment variable.")
-    return tokens[token_name]
+def test_project_path_saas():
+    """Return the test project path for SaaS environment."""
+    # Use an actual project that exists in the GitLab environment
+    return _TEST_ENV_DEFAULTS[_TEST_ENV]["test_project_path_saas"]
+
+
+# Extra flags for each cached --enumerate-projects run
+_ARCHIVE_MODES = {
+    "default": [],
+    "include_archived": ["--include-archived"],
+    "archived_only": ["--archived-only"],
+}
 
 
 @pytest.fixture(scope="session")
-def grace_token(tokens):
-    """Return Grace's security access token for self-hosted testing."""
-    token_name = "SELF_HOSTED_GRACE_TOKEN"
-    if token_name not in tokens:
-        pytest.skip(f"Token {token_name} not found. Please set SELF_HOSTED_GRACE_TOKEN environment variable.")
-    return tokens[token_name]
+def enum_projects_results(saas_gitlab_url, alice_token_saas):
+    """Run every ``--enumerate-projects`` archive mode on SaaS concurrently.
+
+    The runs are independent and network-bound, so they are started
+    together and collected against a shared 45 second deadline.
+    """
+    processes = {
+        mode: start_glato(["-u", saas_gitlab_url, "--enumerate-projects", *extra],
+                          token=alice_token_saas)
+        for mode, extra in _ARCHIVE_MODES.items()
+    }
+    return wait_all(processes, timeout=45)
 
 
 @pytest.fixture(scope="session")
-def henry_token(tokens):
-    """Return Henry's finance access token for self-hosted testing."""
-    token_name = "SELF_HOSTED_HENRY_TOKEN"
-    if token_name not in tokens:
-        pytest.skip(f"Token {token_name} not found. Please set SELF_HOSTED_HENRY_TOKEN environment variable.")
-    return tokens[token_name]
+def enum_projects_include_archived(enum_projects_results):
+    """Return the cached ``--enumerate-projects --include-archived`` run on SaaS."""
+    return enum_projects_results["include_archived"]
 
 
 @pytest.fixture(scope="session")
-def irene_token(tokens):
-    """Return Irene's executive access token for self-hosted testing."""
-    token_name = "SELF_HOSTED_IRENE_TOKEN"
-    if token_name not in tokens:
-        pytest.skip(f"Token {token_name} not found. Please set SELF_HOSTED_IRENE_TOKEN environment variable.")
-    return tokens[token_name]
+def all_projects(enum_projects_include_archived):
+    """Return the parsed project list from the cached ``--include-archived`` run.
+
+    Tests that only inspect project data filter this list instead of
+    scraping the raw output again.
+    """
+    result = enum_projects_include_archived
+    if result.returncode == 124:
+        pytest.skip("Project enumeration timed out")
+    if result.returncode != 0:
+        pytest.fail(f"Project enumeration failed: {result.stderr}")
+    return tuple(parse_projects(result.stdout))
+
+
+def cached_glato(config, args, token):
+    """Run a read-only glato command in-process, reusing output cached by an earlier run.
+
+    Successful output is stored under the pytest cache directory, keyed by
+    the arguments and token, and reused while younger than
+    ``--glato-cache-ttl`` seconds. With the default TTL of 0 glato always
+    runs. Never use this for commands that change anything on the server.
+    """
+    ttl = config.getoption("--glato-cache-ttl")
+    if ttl <= 0:
+        return run_glato_inproc(args, token=token)
+
+    key = hashlib.sha256("\0".join([*args, token or ""]).encode()).hexdigest()
+    path = config.cache.mkdir("glato_enum") / f"{key}.txt"
+    if path.exists() and time.time() - path.stat().st_mtime < ttl:
+        return GlatoResult(subprocess.CompletedProcess(["glato", *args], 0, path.read_text(), ""))
+
+    result = run_glato_inproc(args, token=token)
+    if result.returncode == 0:
+        path.write_text(result.stdout)
+    return result
+
+
+def _token_fingerprint(token):
+    """Return a short digest identifying ``token`` without keeping it in cache keys."""
+    return hashlib.sha256(token.encode()).hexdigest()[:12] if token else ""
 
 
 @pytest.fixture(scope="session")
-def alice_token_saas(tokens):
-    """Return Alice's token for SaaS testing."""
-    token_name = "SAAS_ALICE_TOKEN"
-    if token_name in tokens:
-        return tokens[token_name]
-    if token_name in os.environ:
-        return os.environ[token_name]
-    pytest.skip(f"Token {token_name} not found. Please set SAAS_ALICE_TOKEN environment variable.")
+def glato_session_runner():
+    """Return ``run(args, token=None, timeout=None)`` that runs each command once per session.
+
+    Results are kept in memory, keyed by the arguments and a fingerprint of
+    the token, and every later call with the same key gets the same
+    GlatoResult. Runs that time out are not kept. Only use this for
+    read-only commands.
+    """
+    results = {}
+
+    def run(args, token=None, timeout=None):
+        key = (tuple(args), _token_fingerprint(token))
+        result = results.get(key)
+        if result is None:
+            result = run_glato_inproc(args, token=token, timeout=timeout)
+            if result.returncode != TIMEOUT_RETURNCODE:
+                results[key] = result
+        return result
+
+    return run
+
+
+@pytest.fixture
+def glato_runner(request, glato_session_runner):
+    """Return the session-memoized glato runner, or a fresh one for ``no_cache`` tests."""
+    if request.node.get_closest_marker("no_cache"):
+        return run_glato_inproc
+    return glato_session_runner
 
 
 @pytest.fixture(scope="session")
-def bob_token_saas(tokens):
-    """Return Bob's token for SaaS testing."""
-    token_name = "SAAS_BOB_TOKEN"
-    if token_name in tokens:
-        return tokens[token_name]
-    if token_name in os.environ:
-        return os.environ[token_name]
-    pytest.skip(f"Token {token_name} not found. Please set SAAS_BOB_TOKEN environment variable.")
+def enumerated_groups_output(pytestconfig, saas_gitlab_url, alice_token_saas):
+    """Run ``--enumerate-groups`` on SaaS as Alice once; return lowercased output lines."""
+    result = cached_glato(pytestconfig, ["-u", saas_gitlab_url, "--enumerate-groups"], alice_token_saas)
+    assert result.returncode == 0, "Group enumeration should succeed"
+    return tuple(result.stdout.lower().split('\n'))
+
+
+# The group header and the per-group fields the infrastructure tests check
+_GROUP_FIELD_RE = re.compile(
+    r"^\s*(group|access level|full path): (.*?)\s*$", re.MULTILINE
+)
 
 
 @pytest.fixture(scope="session")
-def irene_token_saas(tokens):
-    """Return Irene's token for SaaS testing."""
-    token_name = "SAAS_IRENE_TOKEN"
-    if token_name in tokens:
-        return tokens[token_name]
-    if token_name in os.environ:
-        return os.environ[token_name]
-    pytest.skip(f"Token {token_name} not found. Please set SAAS_IRENE_TOKEN environment variable.")
+def parsed_groups(enumerated_groups_output):
+    """Map each enumerated group name to its ``access_level`` and ``full_path``.
+
+    The output is scanned once; if a name is listed more than once the
+    first block wins.
+    """
+    groups = {}
+    current = None
+    for match in _GROUP_FIELD_RE.finditer("\n".join(enumerated_groups_output)):
+        key, value = match.groups()
+        if key == "group":
+            current = None if value in groups else groups.setdefault(value, {})
+        elif current is not None:
+            current.setdefault(key.replace(" ", "_"), value)
+    return MappingProxyType(groups)
 
 
 @pytest.fixture(scope="session")
-def test_project_path_saas():
-    """Return the test project path for SaaS environment."""
-    # Use an actual project that exists in the GitLab environment
-    return "engineering-glato/eng-repo-glato"           
\ No newline at end of file
+def enumerated_token_output(pytestconfig, saas_gitlab_url, alice_token_saas):
+    """Run ``--enumerate-token`` on SaaS as Alice once; return lowercased output lines."""
+    result = cached_glato(pytestconfig, ["-u", saas_gitlab_url, "--enumerate-token"], alice_token_saas)
+    assert result.returncode == 0, "Token enumeration should succeed"
+    return tuple(result.stdout.lower().split('\n'))
@@ -6,78 +6,35 @@ addressing the unique challenges of SaaS environments like performance and filte
 """
 
 import pytest
-import subprocess
-import os
+import re
 import time
 from pathlib import Path
 
+from glato.enumerate.enumerate import is_saas_url
 
-def run_glato(args, token=None):
-    """Run glato command with proper environment setup."""
-    cmd = ["glato"]
-    cmd.extend(args)
-    
-    env = os.environ.copy()
-    if token:
-        env["GL_TOKEN"] = token
-    
-    result = subprocess.run(
-        cmd,
-        env=env,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
-    )
-    
-    return result
+from ._glato_runner import LineCounter, run_glato_inproc
 
 
-def run_glato_with_timeout(args, token=None, timeout=30):
-    """Run glato command with timeout for SaaS testing."""
-    cmd = ["glato"]
-    cmd.extend(args)
-    
-    env = os.environ.copy()
-    if token:
-        env["GL_TOKEN"] = token
-    
-    try:
-        result = subprocess.run(
-            cmd,
-            env=env,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=timeout
-        )
-    except subprocess.TimeoutExpired as e:
-        # Create a mock result object for timeout cases
-        class TimeoutResult:
-            def __init__(self, stdout, stderr):
-                self.returncode = 124  # Standard timeout exit code
-                self.stdout = stdout.decode() if isinstance(stdout, bytes) else (stdout or "")
-                self.stderr = stderr.decode() if isinstance(stderr, bytes) else (stderr or "")
-        
-        result = TimeoutResult(e.stdout, e.stderr)
-    
-    return result
+# Output lines the validators read, matched case-insensitively so the
+# (potentially large) output is never lowercased or split as a whole
+_PROJECT_LINE_RE = re.compile(r"^\s*project: ", re.IGNORECASE | re.MULTILINE)
+_USER_INFO_RE = re.compile(r"username:|user id:", re.IGNORECASE)
+_PROJECT_ACCESS_RE = re.compile(
+    r"^\s*project: (.*?)\s*$|access level:(.*)$", re.IGNORECASE | re.MULTILINE
+)
+
+# Access levels that mark the token's user as a project member
+_MEMBER_ACCESS_LEVELS = frozenset({"owner", "maintainer", "developer", "reporter", "guest"})
 
 
 def is_gitlab_saas(gitlab_url: str) -> bool:
     """Detect if GitLab URL is SaaS (gitlab.com) or self-hosted."""
-    try:
-        from glato.enumerate.enumerate import Enumerator
-        
-        class MockAPI:
-            def __init__(self, gitlab_url):
-                self.gitlab_url = gitlab_url
-        
-        enumerator = Enumerator(gitlab_url=gitlab_url)
-        enumerator.api = MockAPI(gitlab_url)
-        return enumerator._is_gitlab_saas()
-    except Exception:
-        # Fallback detection
-        return "gitlab.com" in gitlab_url.lower()
+    return is_saas_url(gitlab_url)
+
+
+# Skipped at collection time by conftest.py when the SaaS URL is not gitlab.com,
+# so skipped runs never resolve token fixtures
+pytestmark = pytest.mark.saas
 
 
 class TestSaaSProjectEnumeration:
@@ -85,11 +42,8 @@ class TestSaaSProjectEnumeration:
     
     def test_saas_basic_enumeration_with_timeout(self, gitlab_url, alice_token_saas):
         """Test basic project enumeration on SaaS with reasonable timeout."""
-        if not is_gitlab_saas(gitlab_url):
-            pytest.skip("SaaS test requires GitLab SaaS environment")
-            
-        result = run_glato_with_timeout(["-u", gitlab_url, "--enumerate-projects"], 
-                                      token=alice_token_saas, timeout=45)
+        result = run_glato_inproc(["-u", gitlab_url, "--enumerate-projects"], 
+                                  token=alice_token_saas, timeout=45)
         
         if result.returncode == 124:
             pytest.skip("Project enumeration timed out on GitLab SaaS due to large number of public projects. "
@@ -102,26 +56,22 @@ class TestSaaSProjectEnumeration:
 
     def test_saas_performance_characteristics(self, gitlab_url, alice_token_saas):
         """Test SaaS project enumeration performance characteristics."""
-        if not is_gitlab_saas(gitlab_url):
-            pytest.skip("SaaS test requires GitLab SaaS environment")
-            
-        start_time = time.time()
-        result = run_glato_with_timeout(["-u", gitlab_url, "--enumerate-projects"], 
-                                      token=alice_token_saas, timeout=30)
-        duration = time.time() - start_time
+        # Count project lines as glato prints them rather than keeping the output
+        projects = LineCounter("Project: ")
+        start_time = time.monotonic()
+        result = run_glato_inproc(["-u", gitlab_url, "--enumerate-projects"], 
+                                  token=alice_token_saas, timeout=30, stdout=projects)
+        duration = time.monotonic() - start_time
+        project_count = projects.count
+        rate = project_count / duration if duration > 0 else 0
         
         if result.returncode == 124:
-            project_count = result.stdout.lower().count("project: ")
             if project_count > 0:
-                rate = project_count / duration if duration > 0 else 0
                 pytest.skip(f"Performance issue: enumerated {project_count} projects in {duration:.1f}s "
                            f"({rate:.1f} projects/sec) before timing out.")
             else:
                 pytest.skip(f"Project enumeration timed out after {duration:.1f}s with no output.")
         elif result.returncode == 0:
-            project_count = result.stdout.lower().count("project: ")
-            rate = project_count / duration if duration > 0 else 0
-            
             print(f"SaaS enumerated {project_count} projects in {duration:.1f}s ({rate:.1f} projects/sec)")
             
             if project_count < 100 and duration < 10:
@@ -134,11 +84,8 @@ class TestSaaSProjectEnumeration:
 
     def test_saas_member_project_filtering(self, gitlab_url, alice_token_saas):
         """Test that SaaS properly filters to focus on member projects."""
-        if not is_gitlab_saas(gitlab_url):
-            pytest.skip("SaaS test requires GitLab SaaS environment")
-            
-        result = run_glato_with_timeout(["-u", gitlab_url, "--enumerate-projects"], 
-                                      token=alice_token_saas, timeout=45)
+        result = run_glato_inproc(["-u", gitlab_url, "--enumerate-projects"], 
+                                  token=alice_token_saas, timeout=45)
         
         if result.returncode == 124:
             pytest.skip("Project enumeration timed out - demonstrates need for member-only filtering.")
@@ -158,11 +105,8 @@ class TestSaaSProjectEnumeration:
 
     def test_saas_access_level_validation(self, gitlab_url, alice_token_saas):
         """Test that project access levels are properly identified on SaaS."""
-        if not is_gitlab_saas(gitlab_url):
-            pytest.skip("SaaS test requires GitLab SaaS environment")
-            
-        result = run_glato_with_timeout(["-u", gitlab_url, "--enumerate-projects"], 
-                                      token=alice_token_saas, timeout=45)
+        result = run_glato_inproc(["-u", gitlab_url, "--enumerate-projects"], 
+                                  token=alice_token_saas, timeout=45)
         
         if result.returncode == 124:
             pytest.skip("Project enumeration timed out - cannot validate access levels")
@@ -171,11 +115,8 @@ class TestSaaSProjectEnumeration:
 
     def test_saas_limited_token_access(self, gitlab_url, bob_token_saas):
         """Test project enumeration with limited SaaS token."""
-        if not is_gitlab_saas(gitlab_url):
-            pytest.skip("SaaS test requires GitLab SaaS environment")
-            
-        result = run_glato_with_timeout(["-u", gitlab_url, "--enumerate-projects"], 
-                                      token=bob_token_saas, timeout=45)
+        result = run_glato_inproc(["-u", gitlab_url, "--enumerate-projects"], 
+                                  token=bob_token_saas, timeout=45)
         
         if result.returncode == 124:
             pytest.skip("Project enumeration timed out with limited token - expected")
@@ -185,11 +126,8 @@ class TestSaaSProjectEnumeration:
 
     def test_saas_executive_token_access(self, gitlab_url, irene_token_saas):
         """Test project enumeration with executive SaaS token."""
-        if not is_gitlab_saas(gitlab_url):
-            pytest.skip("SaaS test requires GitLab SaaS environment")
-            
-        result = run_glato_with_timeout(["-u", gitlab_url, "--enumerate-projects"], 
-                                      token=irene_token_saas, timeout=45)
+        result = run_glato_inproc(["-u", gitlab_url, "--enumerate-projects"], 
+                                  token=irene_token_saas, timeout=45)
         
         if result.returncode == 124:
             pytest.skip("Project enumeration timed out with executive token")
@@ -199,10 +137,7 @@ class TestSaaSProjectEnumeration:
 
     def test_saas_branch_protection_enumeration(self, gitlab_url, alice_token_saas):
         """Test branch protection enumeration on SaaS."""
-        if not is_gitlab_saas(gitlab_url):
-            pytest.skip("SaaS test requires GitLab SaaS environment")
-            
-        result = run_glato_with_timeout([
+        result = run_glato_inproc([
             "-u", gitlab_url,
             "--enumerate-projects",
             "--check-branch-protections"
@@ -217,15 +152,12 @@ class TestSaaSProjectEnumeration:
 
     def test_saas_environment_detection(self, gitlab_url, alice_token_saas):
         """Test that SaaS environment is correctly detected."""
-        if not is_gitlab_saas(gitlab_url):
-            pytest.skip("SaaS test requires GitLab SaaS environment")
-            
         # Verify detection function works correctly
         assert is_gitlab_saas(gitlab_url), \
             f"URL {gitlab_url} should be detected as SaaS"
         
-        result = run_glato_with_timeout(["-u", gitlab_url, "--enumerate-projects"], 
-                                      token=alice_token_saas, timeout=45)
+        result = run_glato_inproc(["-u", gitlab_url, "--enumerate-projects"], 
+                                  token=alice_token_saas, timeout=45)
         
         if result.returncode == 124:
             pytest.skip("SaaS enumeration timed out - expected behavior")
@@ -235,53 +167,44 @@ class TestSaaSProjectEnumeration:
 
     def _validate_project_enumeration_output(self, output: str):
         """Validate project enumeration output format."""
-        output_lines = output.lower().split('\n')
-        
-        project_lines = [line for line in output_lines if line.strip().startswith("project: ")]
-        assert len(project_lines) > 0, "Should find at least some projects"
+        project_count = len(_PROJECT_LINE_RE.findall(output))
+        assert project_count > 0, "Should find at least some projects"
         
-        has_user_info = any("username:" in line or "user id:" in line for line in output_lines)
+        has_user_info = _USER_INFO_RE.search(output) is not None
         assert has_user_info, "Should contain user information"
         
-        print(f"✅ Project enumeration output validated: {len(project_lines)} projects found")
+        print(f"✅ Project enumeration output validated: {project_count} projects found")
+
+    def _project_access_levels(self, output: str):
+        """Yield (project, access level) pairs, both lowercased, in one pass over the output."""
+        current_project = None
+        for match in _PROJECT_ACCESS_RE.finditer(output):
+            project, access_level = match.groups()
+            if project is not None:
+                current_project = project.lower()
+            elif current_project:
+                yield current_project, access_level.strip().lower()
+                current_project = None
 
     def _count_project_types(self, output: str):
         """Count member vs non-member projects in output."""
-        output_lines = output.lower().split('\n')
         member_projects = 0
         non_member_projects = 0
         
-        current_project = None
-        for line in output_lines:
-            if line.strip().startswith("project: "):
-                current_project = line.split("project: ")[1].strip()
-            elif "access level:" in line and current_project:
-                access_level = line.split("access level:")[1].strip()
-                if access_level in ["owner", "maintainer", "developer", "reporter", "guest"]:
-                    member_projects += 1
-                elif access_level == "not a member":
-                    non_member_projects += 1
-                current_project = None
+        for _, access_level in self._project_access_levels(output):
+            if access_level in _MEMBER_ACCESS_LEVELS:
+                member_projects += 1
+            elif access_level == "not a member":
+                non_member_projects += 1
         
         return member_projects, non_member_projects
 
     def _validate_access_levels(self, output: str):
         """Validate access level information in SaaS project enumeration output."""
-        output_lines = output.lower().split('\n')
-        
-        projects_with_access = []
-        current_project = None
-        
-        for line in output_lines:
-            if line.strip().startswith("project: "):
-                current_project = line.split("project: ")[1].strip()
-            elif "access level:" in line and current_project:
-                access_level = line.split("access level:")[1].strip()
-                projects_with_access.append({
-                    "name": current_project,
-                    "access_level": access_level
-                })
-                current_project = None
+        projects_with_access = [
+            {"name": name, "access_level": access_level}
+            for name, access_level in self._project_access_levels(output)
+        ]
         
         assert len(projects_with_access) > 0, "Should find projects with access level information"
         
@@ -5,18 +5,82 @@ This module tests the runner tag parsing feature against real GitLab SaaS projec
 that were specifically created with diverse GitLab CI configurations.
 """
 
+import contextlib
+import functools
+import io
+import json
 import os
 import pytest
+import requests
 import time
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType, SimpleNamespace
 from glato.enumerate.enumerate import Enumerator
 from glato.gitlab.workflow_parser import WorkflowSecretParser
 
+from ._glato_runner import missing_from
+
+
+# Job names and tags each project's analysis output must mention
+EXPECTED_BASIC = frozenset({"build_job", "test_job", "docker", "linux", "kubernetes", "test-env"})
+EXPECTED_ADVANCED = frozenset({"build_job", "dynamic_job", "conditional_deploy", "production", "secure"})
+EXPECTED_MATRIX = frozenset({"matrix_test", "parallel_job"})
+
+# Stand-in API for tests that only parse YAML and never call GitLab
+_MOCK_API = SimpleNamespace()
+
+
+def analyze_workflow_output(enumerator, project_id):
+    """Run the enumerator's workflow runner analysis and return what it printed.
+
+    Output goes to an in-memory buffer for just this call, so it holds only
+    the analysis and not the test's own progress messages.
+    """
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        enumerator._analyze_workflow_runner_requirements(project_id)
+    return buffer.getvalue()
+
+
+def fetch_workflows_graphql(api, projects, path='.gitlab-ci.yml', ref='main'):
+    """Fetch ``path`` from several projects with a single GraphQL request.
+
+    ``projects`` maps keys to project dicts with ``id`` and ``path``. Returns
+    the file contents found, by key, and stores each in the API client's
+    file cache so later get_file_content() calls are served from memory.
+    Returns an empty dict if the request fails.
+    """
+    aliases = {f"p{i}": key for i, key in enumerate(projects)}
+    query = "query {" + " ".join(
+        f'{alias}: project(fullPath: {json.dumps(projects[key]["path"])}) '
+        f'{{ repository {{ blobs(ref: {json.dumps(ref)}, paths: [{json.dumps(path)}]) '
+        f'{{ nodes {{ rawBlob }} }} }} }}'
+        for alias, key in aliases.items()
+    ) + "}"
+    # The GraphQL endpoint lives beside the versioned REST API
+    graphql_url = api.gitlab_url.rsplit('/api/', 1)[0] + '/api/graphql'
+    try:
+        resp = api.session.post(graphql_url, headers=api.headers, proxies=api.proxies,
+                                json={'query': query}, verify=api.verify_ssl, timeout=30)
+        data = resp.json().get('data') or {}
+    except (requests.exceptions.RequestException, ValueError):
+        return {}
+
+    workflows = {}
+    for alias, key in aliases.items():
+        nodes = (((data.get(alias) or {}).get('repository') or {}).get('blobs') or {}).get('nodes') or []
+        if nodes and nodes[0].get('rawBlob') is not None:
+            content = workflows[key] = nodes[0]['rawBlob']
+            api.prime_file_cache(projects[key]['id'], path, content, ref=ref)
+    return workflows
+
 
 class TestRunnerTagParsingReal:
     """Real infrastructure tests for runner tag parsing functionality."""
     
-    # SaaS Test Projects (created in api-glato group)
-    SAAS_PROJECTS = {
+    # SaaS Test Projects (created in api-glato group); read-only, since the
+    # class fixtures share it
+    SAAS_PROJECTS = MappingProxyType({
         'basic': {
             'id': 70569298,
             'path': 'product-glato/api-glato/runner-tags-basic-glato',
@@ -37,123 +101,120 @@ class TestRunnerTagParsingReal:
             'path': 'product-glato/api-glato/runner-tags-matrix-glato',
             'name': 'runner-tags-matrix-glato'
         }
-    }
+    })
 
 
 class TestSaaSRunnerTagParsingReal(TestRunnerTagParsingReal):
     """GitLab SaaS real infrastructure tests."""
     
-    @pytest.fixture(autouse=True)
-    def setup(self, gitlab_url, tokens):
-        """Set up test environment for SaaS testing."""
-        self.gitlab_url = gitlab_url
-        self.token = (
-            tokens.get('SAAS_ADMIN_TOKEN') or 
-            tokens.get('SAAS_ALICE_TOKEN') or
+    @pytest.fixture(scope="class")
+    @classmethod
+    def saas_token(cls, resolve_token):
+        """Return the SaaS admin token, falling back to Alice's."""
+        token = (
+            resolve_token('SAAS_ADMIN_TOKEN') or 
+            resolve_token('SAAS_ALICE_TOKEN') or
             os.getenv("SAAS_ADMIN_TOKEN") or
             os.getenv("SAAS_ALICE_TOKEN")
         )
-        assert self.token, "SaaS admin or alice token required"
-        
-        print(f"🔧 Setup complete for SaaS runner tag parsing tests")
+        assert token, "SaaS admin or alice token required"
+        return token
+    
+    @pytest.fixture(scope="class")
+    @classmethod
+    def enumerator(cls, saas_gitlab_url, saas_token):
+        """One Enumerator for the class, so its API client and connections are reused."""
+        return Enumerator(token=saas_token, gitlab_url=saas_gitlab_url)
+    
+    @pytest.fixture(scope="class")
+    @classmethod
+    def api(cls, enumerator):
+        """The API client of the shared enumerator."""
+        return enumerator.api
+    
+    @pytest.fixture(scope="class")
+    @classmethod
+    def prefetched_workflows(cls, api):
+        """Fetch every test project's .gitlab-ci.yml into the API cache.
 
-    def test_basic_runner_tag_parsing_real(self, capsys):
-        """Test basic runner tag parsing with real GitLab SaaS project."""
-        print("🧪 Testing basic runner tag parsing on real SaaS project...")
-        
-        # Create enumerator with developer access simulation
-        enumerator = Enumerator(
-            token=self.token,
-            gitlab_url=self.gitlab_url
-        )
-        
-        # Test the actual runner tag parsing functionality
-        project_id = self.SAAS_PROJECTS['basic']['id']
-        enumerator._analyze_workflow_runner_requirements(project_id)
-        
-        # Capture output
-        captured = capsys.readouterr()
-        output = captured.out
-        
-        # Verify basic CI parsing worked
-        assert "[*] Analyzing GitLab CI workflows for runner requirements..." in output
-        assert "[+] Found workflow file: .gitlab-ci.yml" in output
-        assert "[*] Runner Tags Required by Workflow:" in output
-        
-        # Verify specific tags from basic configuration
-        assert "build_job" in output
-        assert "test_job" in output
-        assert "docker" in output
-        assert "linux" in output
-        assert "kubernetes" in output
-        assert "test-env" in output
-        
-        print("✅ Basic runner tag parsing test passed")
+        All files are requested in one GraphQL query; any the query does not
+        return are fetched over REST concurrently. The tests then read the
+        workflows from the shared client's file cache instead of fetching
+        them from gitlab.com one after another.
+        """
+        workflows = fetch_workflows_graphql(api, cls.SAAS_PROJECTS)
+        missing = [key for key in cls.SAAS_PROJECTS if workflows.get(key) is None]
+        if missing:
+            parser = WorkflowSecretParser(api)
+            with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+                futures = {
+                    key: executor.submit(parser.get_workflow_file,
+                                         cls.SAAS_PROJECTS[key]['id'], path='.gitlab-ci.yml')
+                    for key in missing
+                }
+                workflows.update((key, future.result()) for key, future in futures.items())
+        return workflows
+    
+    @pytest.fixture(scope="class")
+    @classmethod
+    def parse_workflow(cls, api):
+        """Return ``parse_workflow_yaml`` memoised by content for the class.
 
-    def test_advanced_runner_tag_parsing_real(self, capsys):
-        """Test advanced runner tag parsing with rules and variables."""
-        print("🧪 Testing advanced runner tag parsing on real SaaS project...")
-        
-        enumerator = Enumerator(
-            token=self.token,
-            gitlab_url=self.gitlab_url
-        )
-        
-        project_id = self.SAAS_PROJECTS['advanced']['id']
-        enumerator._analyze_workflow_runner_requirements(project_id)
-        
-        captured = capsys.readouterr()
-        output = captured.out
-        
-        # Verify advanced features are detected
-        assert "build_job" in output
-        assert "dynamic_job" in output
-        assert "conditional_deploy" in output
-        
-        # Verify inheritance
-        assert "production" in output
-        assert "secure" in output
-        
-        # Verify variables
-        assert "$RUNNER_TYPE" in output or "custom-runner" in output
-        
-        # Verify conditional tags
-        assert "prod-runner" in output or "staging-runner" in output
+        The parsed trees are shared between tests and must not be modified.
+        """
+        return functools.lru_cache(maxsize=None)(WorkflowSecretParser(api).parse_workflow_yaml)
+    
+    @pytest.fixture(autouse=True)
+    def setup(self, gitlab_url, saas_token):
+        """Set up test environment for SaaS testing."""
+        self.gitlab_url = gitlab_url
+        self.token = saas_token
         
-        print("✅ Advanced runner tag parsing test passed")
+        print(f"🔧 Setup complete for SaaS runner tag parsing tests")
 
-    def test_matrix_runner_tag_parsing_real(self, capsys):
-        """Test matrix/parallel job runner tag parsing."""
-        print("🧪 Testing matrix runner tag parsing on real SaaS project...")
-        
-        enumerator = Enumerator(
-            token=self.token,
-            gitlab_url=self.gitlab_url
-        )
-        
-        project_id = self.SAAS_PROJECTS['matrix']['id']
-        enumerator._analyze_workflow_runner_requirements(project_id)
+    @pytest.mark.parametrize("project_key, expected, alternatives", [
+        # Basic CI parsing, plus the tags from the basic configuration
+        pytest.param('basic', EXPECTED_BASIC | {
+            "[*] Analyzing GitLab CI workflows for runner requirements...",
+            "[+] Found workflow file: .gitlab-ci.yml",
+            "[*] Runner Tags Required by Workflow:",
+        }, (), id='basic'),
+        # Advanced features including inherited tags, variables and
+        # conditional tags
+        pytest.param('advanced', EXPECTED_ADVANCED, (
+            ("$RUNNER_TYPE", "custom-runner"),
+            ("prod-runner", "staging-runner"),
+        ), id='advanced'),
+        # Matrix jobs and platform-specific (variable) tags
+        pytest.param('matrix', EXPECTED_MATRIX, (
+            ("$PLATFORM", "$RUNNER_TYPE"),
+        ), id='matrix'),
+    ])
+    def test_runner_tag_parsing_real(self, enumerator, prefetched_workflows,
+                                     project_key, expected, alternatives):
+        """Test runner tag parsing with a real GitLab SaaS project.
+
+        Every string in ``expected`` must appear in the analysis output, and
+        at least one string from each group in ``alternatives``.
+        """
+        print(f"🧪 Testing {project_key} runner tag parsing on real SaaS project...")
         
-        captured = capsys.readouterr()
-        output = captured.out
+        project_id = self.SAAS_PROJECTS[project_key]['id']
+        output = analyze_workflow_output(enumerator, project_id)
         
-        # Verify matrix job parsing
-        assert "matrix_test" in output
-        assert "parallel_job" in output
+        missing = missing_from(output, expected)
+        assert not missing, f"Missing from {project_key} analysis output: {sorted(missing)}"
         
-        # Verify platform-specific tags (variables)
-        assert "$PLATFORM" in output or "$RUNNER_TYPE" in output
+        for group in alternatives:
+            assert any(text in output for text in group), \
+                f"{project_key} analysis output should mention one of {group}"
         
-        print("✅ Matrix runner tag parsing test passed")
+        print(f"✅ {project_key.capitalize()} runner tag parsing test passed")
 
-    def test_workflow_parser_direct_saas(self):
+    def test_workflow_parser_direct_saas(self, api, prefetched_workflows, parse_workflow):
         """Test workflow parser directly against SaaS project."""
         print("🧪 Testing workflow parser directly on SaaS...")
         
-        from glato.gitlab.api import Api
-        
-        # Create API client
-        api = Api(pat=self.token, gitlab_url=self.gitlab_url)
         parser = WorkflowSecretParser(api)
         
         # Test getting and parsing workflow file
@@ -166,7 +227,7 @@ class TestSaaSRunnerTagParsingReal(TestRunnerTagParsingReal):
         assert "tags:" in workflow_content, "Workflow should contain tags"
         
         # Parse the workflow
-        parsed_yaml = parser.parse_workflow_yaml(workflow_content)
+        parsed_yaml = parse_workflow(workflow_content)
         assert parsed_yaml is not None, "Should be able to parse workflow YAML"
         
         # Extract runner tags
@@ -181,13 +242,10 @@ class TestSaaSRunnerTagParsingReal(TestRunnerTagParsingReal):
         
         print(f"✅ Direct workflow parser test passed - found {len(runner_tags)} tags")
 
-    def test_log_parsing_saas(self):
+    def test_log_parsing_saas(self, api):
         """Test pipeline log parsing functionality on SaaS."""
         print("🧪 Testing pipeline log parsing on SaaS...")
         
-        from glato.gitlab.api import Api
-        
-        api = Api(pat=self.token, gitlab_url=self.gitlab_url)
         parser = WorkflowSecretParser(api)
         
         # Test log parsing (may have no pipelines, that's ok)
@@ -232,9 +290,8 @@ test_job:
   script: ['echo "test"']
 '''
         
-        # Create mock API for parsing
-        mock_api = type('MockAPI', (), {})()
-        parser = WorkflowSecretParser(mock_api)
+        # Parsing needs no API access
+        parser = WorkflowSecretParser(_MOCK_API)
         
         # Parse the content
         parsed_yaml = parser.parse_workflow_yaml(test_ci_content)
@@ -266,8 +323,7 @@ job_with_variables:
   script: ['echo "test"']
 '''
         
-        mock_api = type('MockAPI', (), {})()
-        parser = WorkflowSecretParser(mock_api)
+        parser = WorkflowSecretParser(_MOCK_API)
         
         parsed_yaml = parser.parse_workflow_yaml(test_ci_content)
         runner_tags = parser.extract_runner_tags(parsed_yaml, 'test.yml')
@@ -6,78 +6,22 @@ on self-hosted GitLab instances, including PPE attack prevention.
 """
 
 import pytest
-import subprocess
-import os
-import time
-from pathlib import Path
-
-
-def run_glato(args, token=None):
-    """Run glato command with proper environment setup."""
-    cmd = ["glato"]
-    cmd.extend(args)
-    
-    env = os.environ.copy()
-    if token:
-        env["GL_TOKEN"] = token
-    
-    result = subprocess.run(
-        cmd,
-        env=env,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
-    )
-    
-    return result
-
-
-def run_glato_with_timeout(args, token=None, timeout=30):
-    """Run glato command with timeout."""
-    cmd = ["glato"]
-    cmd.extend(args)
-    
-    env = os.environ.copy()
-    if token:
-        env["GL_TOKEN"] = token
-    
-    try:
-        result = subprocess.run(
-            cmd,
-            env=env,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=timeout
-        )
-    except subprocess.TimeoutExpired:
-        # Return a mock result for timeout
-        class TimeoutResult:
-            returncode = 124
-            stdout = ""
-            stderr = "Command timed out"
-        return TimeoutResult()
-    
-    return result
-
-
-def is_self_hosted(url):
-    """Check if URL is self-hosted GitLab."""
-    return "gitlab.com" not in url.lower()
+import re
+
+
+# Path of an archived project header: "Project: namespace/project-name [ARCHIVED]"
+_ARCHIVED_PATH_RE = re.compile(r"^[ \t]*Project: (\S+/\S+) \[ARCHIVED\]", re.MULTILINE)
 
 
 def count_archived_projects(output):
-    """Count archived and non-archived projects in output."""
-    lines = output.split('\n')
-    archived_count = 0
-    total_projects = 0
-    
-    for line in lines:
-        if line.strip().startswith("Project: "):
-            total_projects += 1
-            if "[ARCHIVED]" in line:
-                archived_count += 1
-    
+    """Count archived and non-archived projects in output.
+
+    glato prints each project header on a fresh line as ``Project: <path>``
+    and ends archived ones with `` [ARCHIVED]``, so two substring counts
+    find them without splitting the output into lines.
+    """
+    total_projects = output.count("\nProject: ")
+    archived_count = output.count(" [ARCHIVED]\n")
     return archived_count, total_projects - archived_count
 
 
@@ -86,17 +30,62 @@ def has_archived_projects(output):
     return "[ARCHIVED]" in output
 
 
+def _enumerate_as_alice(runner, gitlab_url, alice_token, *flags, timeout=30):
+    """Run ``--enumerate-projects`` as Alice once per session."""
+    return runner(["-u", gitlab_url, "--enumerate-projects", *flags], token=alice_token, timeout=timeout)
+
+
+@pytest.fixture(scope="session")
+def alice_enum_default(glato_session_runner, selfhosted_gitlab_url, alice_token):
+    """Return Alice's default project enumeration."""
+    return _enumerate_as_alice(glato_session_runner, selfhosted_gitlab_url, alice_token)
+
+
+@pytest.fixture(scope="session")
+def alice_enum_include_archived(glato_session_runner, selfhosted_gitlab_url, alice_token):
+    """Return Alice's ``--include-archived`` project enumeration."""
+    return _enumerate_as_alice(glato_session_runner, selfhosted_gitlab_url, alice_token,
+                               "--include-archived")
+
+
+@pytest.fixture(scope="session")
+def alice_enum_archived_only(glato_session_runner, selfhosted_gitlab_url, alice_token):
+    """Return Alice's ``--archived-only`` project enumeration."""
+    return _enumerate_as_alice(glato_session_runner, selfhosted_gitlab_url, alice_token,
+                               "--archived-only")
+
+
+@pytest.fixture(scope="session")
+def alice_full_enum(glato_session_runner, selfhosted_gitlab_url, alice_token):
+    """Return one ``--include-archived`` run as Alice with secrets, branch protections and runners.
+
+    The secrets, branch protection and runner tests each read their part of
+    this output, so projects are enumerated once instead of three times.
+    """
+    return _enumerate_as_alice(glato_session_runner, selfhosted_gitlab_url, alice_token,
+                               "--enumerate-secrets", "--check-branch-protections",
+                               "--enumerate-groups", "--enumerate-runners", "--include-archived",
+                               timeout=90)
+
+
+@pytest.fixture(scope="session")
+def first_archived_project_path(alice_enum_archived_only):
+    """Return the path of the first archived project Alice can see, or None."""
+    result = alice_enum_archived_only
+    if result.returncode != 0:
+        pytest.skip(f"Could not enumerate projects to test PPE prevention: {result.stderr}")
+    match = _ARCHIVED_PATH_RE.search(result.stdout)
+    return match[1] if match else None
+
+
 @pytest.mark.selfhosted
+@pytest.mark.xdist_group("archived")
 class TestSelfHostedArchivedProjects:
     """Test archived project functionality on self-hosted GitLab."""
 
-    def test_selfhosted_default_excludes_archived(self, gitlab_url, alice_token):
+    def test_selfhosted_default_excludes_archived(self, alice_enum_default):
         """Test that archived projects are excluded by default on self-hosted."""
-        if not is_self_hosted(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
-        result = run_glato_with_timeout(["-u", gitlab_url, "--enumerate-projects"], 
-                                      token=alice_token, timeout=30)
+        result = alice_enum_default
         
         if result.returncode == 0:
             archived_count, active_count = count_archived_projects(result.stdout)
@@ -107,13 +96,9 @@ class TestSelfHostedArchivedProjects:
         else:
             pytest.fail(f"Project enumeration failed: {result.stderr}")
 
-    def test_selfhosted_include_archived_comprehensive(self, gitlab_url, alice_token):
+    def test_selfhosted_include_archived_comprehensive(self, alice_enum_include_archived):
         """Test comprehensive archived project enumeration on self-hosted."""
-        if not is_self_hosted(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
-        result = run_glato_with_timeout(["-u", gitlab_url, "--enumerate-projects", "--include-archived"], 
-                                      token=alice_token, timeout=30)
+        result = alice_enum_include_archived
         
         if result.returncode == 0:
             archived_count, active_count = count_archived_projects(result.stdout)
@@ -126,13 +111,9 @@ class TestSelfHostedArchivedProjects:
         else:
             pytest.fail(f"Project enumeration failed: {result.stderr}")
 
-    def test_selfhosted_archived_only_filtering(self, gitlab_url, alice_token):
+    def test_selfhosted_archived_only_filtering(self, alice_enum_archived_only):
         """Test --archived-only filtering on self-hosted."""
-        if not is_self_hosted(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
-        result = run_glato_with_timeout(["-u", gitlab_url, "--enumerate-projects", "--archived-only"], 
-                                      token=alice_token, timeout=30)
+        result = alice_enum_archived_only
         
         if result.returncode == 0:
             archived_count, active_count = count_archived_projects(result.stdout)
@@ -145,13 +126,9 @@ class TestSelfHostedArchivedProjects:
         else:
             pytest.fail(f"Project enumeration failed: {result.stderr}")
 
-    def test_selfhosted_archived_project_detailed_info(self, gitlab_url, alice_token):
+    def test_selfhosted_archived_project_detailed_info(self, alice_enum_include_archived):
         """Test detailed information display for archived projects on self-hosted."""
-        if not is_self_hosted(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
-        result = run_glato_with_timeout(["-u", gitlab_url, "--enumerate-projects", "--include-archived"], 
-                                      token=alice_token, timeout=30)
+        result = alice_enum_include_archived
         
         if result.returncode == 0:
             if has_archived_projects(result.stdout):
@@ -176,50 +153,27 @@ class TestSelfHostedArchivedProjects:
         else:
             pytest.fail(f"Project enumeration failed: {result.stderr}")
 
-    def test_selfhosted_archived_ppe_attack_prevention(self, gitlab_url, alice_token):
+    def test_selfhosted_archived_ppe_attack_prevention(self, first_archived_project_path):
         """Test that PPE attacks are prevented on archived projects."""
-        if not is_self_hosted(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
-        # First, find an archived project (if any exist)
-        enum_result = run_glato_with_timeout(["-u", gitlab_url, "--enumerate-projects", "--archived-only"], 
-                                           token=alice_token, timeout=30)
+        archived_project_path = first_archived_project_path
         
-        if enum_result.returncode == 0:
-            lines = enum_result.stdout.split('\n')
-            archived_project_path = None
-            
-            for line in lines:
-                if "[ARCHIVED]" in line and line.strip().startswith("Project: "):
-                    # Extract project path from "Project: namespace/project-name [ARCHIVED]"
-                    project_line = line.replace("Project: ", "").replace(" [ARCHIVED]", "").strip()
-                    if "/" in project_line:  # Valid project path format
-                        archived_project_path = project_line
-                        break
-            
-            if archived_project_path:
-                # Test PPE attack prevention on archived project
-                # Note: This should show warning but we'll test in non-interactive mode
-                print(f"Testing PPE attack prevention on archived project: {archived_project_path}")
-                
-                # The attack should detect it's archived and show warning
-                # In a real test environment, we'd need to test the warning behavior
-                print("✅ Found archived project to test PPE prevention")
-            else:
-                print("✅ No archived projects found - cannot test PPE prevention")
+        if archived_project_path:
+            # Test PPE attack prevention on archived project
+            # Note: This should show warning but we'll test in non-interactive mode
+            print(f"Testing PPE attack prevention on archived project: {archived_project_path}")
+            
+            # The attack should detect it's archived and show warning
+            # In a real test environment, we'd need to test the warning behavior
+            print("✅ Found archived project to test PPE prevention")
         else:
-            pytest.skip(f"Could not enumerate projects to test PPE prevention: {enum_result.stderr}")
+            print("✅ No archived projects found - cannot test PPE prevention")
 
-    def test_selfhosted_access_level_consistency_with_archives(self, gitlab_url, alice_token):
+    def test_selfhosted_access_level_consistency_with_archives(self, alice_enum_include_archived):
         """Test that access levels are consistent for archived vs active projects."""
-        if not is_self_hosted(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
         # Test with different access levels
         access_levels = ["Owner", "Maintainer", "Developer", "Guest"]
         
-        result = run_glato_with_timeout(["-u", gitlab_url, "--enumerate-projects", "--include-archived"], 
-                                      token=alice_token, timeout=30)
+        result = alice_enum_include_archived
         
         if result.returncode == 0:
             archived_count, active_count = count_archived_projects(result.stdout)
@@ -233,31 +187,23 @@ class TestSelfHostedArchivedProjects:
         else:
             pytest.fail(f"Project enumeration failed: {result.stderr}")
 
-    def test_selfhosted_secrets_enumeration_with_archives(self, gitlab_url, alice_token):
+    def test_selfhosted_secrets_enumeration_with_archives(self, alice_full_enum):
         """Test secrets enumeration behavior with archived projects."""
-        if not is_self_hosted(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
-        result = run_glato_with_timeout(["-u", gitlab_url, "--enumerate-projects", "--enumerate-secrets", "--include-archived"], 
-                                      token=alice_token, timeout=45)
+        result = alice_full_enum
         
         if result.returncode == 0:
             # Should enumerate secrets for both archived and active projects
             # (though archived projects may have limited secrets access)
-            if "Re-run with --enumerate-secrets" in result.stdout or "variables" in result.stdout.lower():
+            if "Re-run with --enumerate-secrets" in result.stdout or "variables" in result.lower_stdout:
                 print("✅ Secrets enumeration works with archived projects included")
             else:
                 print("✅ No secrets found (acceptable)")
         else:
             pytest.fail(f"Secrets enumeration with archived projects failed: {result.stderr}")
 
-    def test_selfhosted_branch_protection_with_archives(self, gitlab_url, alice_token):
+    def test_selfhosted_branch_protection_with_archives(self, alice_full_enum):
         """Test branch protection checking with archived projects."""
-        if not is_self_hosted(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
-        result = run_glato_with_timeout(["-u", gitlab_url, "--enumerate-projects", "--check-branch-protections", "--include-archived"], 
-                                      token=alice_token, timeout=45)
+        result = alice_full_enum
         
         if result.returncode == 0:
             # Branch protection should be checked for both archived and active projects
@@ -268,17 +214,13 @@ class TestSelfHostedArchivedProjects:
         else:
             pytest.fail(f"Branch protection check with archived projects failed: {result.stderr}")
 
-    def test_selfhosted_runner_enumeration_with_archives(self, gitlab_url, alice_token):
+    def test_selfhosted_runner_enumeration_with_archives(self, alice_full_enum):
         """Test runner enumeration behavior with archived projects."""
-        if not is_self_hosted(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
-        result = run_glato_with_timeout(["-u", gitlab_url, "--enumerate-projects", "--enumerate-groups", "--enumerate-runners", "--include-archived"], 
-                                      token=alice_token, timeout=60)
+        result = alice_full_enum
         
         if result.returncode == 0:
             # Runner enumeration should work regardless of archive status
-            if "runners" in result.stdout.lower() or "Runner" in result.stdout:
+            if "runners" in result.lower_stdout or "Runner" in result.stdout:
                 print("✅ Runner enumeration works with archived projects included")
             else:
                 print("✅ No runners found (acceptable)")
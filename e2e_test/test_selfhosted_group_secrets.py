@@ -6,131 +6,113 @@ in self-hosted GitLab environments.
 """
 
 import pytest
-import subprocess
-import os
+import re
 
+from ._glato_runner import missing_from
 
-def run_glato(args, token=None):
-    """Run glato command with proper environment setup."""
-    cmd = ["glato"]
-    cmd.extend(args)
-    
-    env = os.environ.copy()
-    if token:
-        env["GL_TOKEN"] = token
-    
-    result = subprocess.run(
-        cmd,
-        env=env,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
-    )
-    
-    return result
 
+# Indicators, variables and projects Alice's secrets enumeration must show, lowercased
+FULL_ACCESS_SECRETS_OUTPUT = frozenset({
+    "found", "project variable", "protected", "masked",
+    "digitalocean_access_token", "aws_access_key_id", "aws_secret_access_key",
+    "firebase_token", "github_token", "slack_webhook_url", "vault_token", "tf_api_token",
+    "infrastructure-glato", "security-scanner-glato",
+})
+
+# Lowercased value prefixes of the seeded AWS, GitHub, DigitalOcean and Terraform Cloud secrets
+SECRET_VALUE_PREFIXES = frozenset({"akia", "ghp_", "dop_v1_", "tfc-token-"})
+
+# Lowercased output from a variable's name up to the next project, or from
+# tf_api_token up to vault_token, which glato lists after it
+_AWS_SECRET_SECTION_RE = re.compile(r"aws_secret_access_key(.*?)(?:project:|\Z)", re.DOTALL)
+_TF_TOKEN_SECTION_RE = re.compile(r"tf_api_token(.*?)(?:vault_token|\Z)", re.DOTALL)
 
+
+@pytest.mark.xdist_group("secrets")
 class TestGroupEnumeration:
     """Test cases for group enumeration functionality."""
     
-    def test_enumerate_groups_full_access(self, gitlab_url, alice_token):
+    def test_enumerate_groups_full_access(self, glato_runner, gitlab_url, alice_token):
         """Test that groups can be enumerated with a full access token."""
-        result = run_glato(["-u", gitlab_url, "--enumerate-groups"], token=alice_token)
+        result = glato_runner(["-u", gitlab_url, "--enumerate-groups"], token=alice_token)
         
         # Check that at least one group is found
-        assert "group:" in result.stdout.lower(), "No groups found"
+        assert "group:" in result.lower_stdout, "No groups found"
         # Check for the group Alice has access to
-        assert "engineering-glato" in result.stdout.lower(), "Engineering group not found"
+        assert "engineering-glato" in result.lower_stdout, "Engineering group not found"
     
-    def test_enumerate_groups_with_limited_access(self, gitlab_url, bob_token):
+    def test_enumerate_groups_with_limited_access(self, glato_runner, gitlab_url, bob_token):
         """Test that only accessible groups are enumerated with a limited token."""
         # Just verify the command runs with Bob's token
-        result = run_glato(["-u", gitlab_url, "--enumerate-groups"], token=bob_token)
+        result = glato_runner(["-u", gitlab_url, "--enumerate-groups"], token=bob_token)
         
         # Check that Bob's info is shown
-        assert "bob-glato" in result.stdout.lower(), "User info not found"
+        assert "bob-glato" in result.lower_stdout, "User info not found"
 
 
+@pytest.mark.xdist_group("secrets")
 class TestSecretEnumeration:
     """Test cases for secret enumeration functionality."""
     
-    def test_enumerate_secrets_with_full_access(self, gitlab_url, alice_token):
+    def test_enumerate_secrets_with_full_access(self, glato_runner, gitlab_url, alice_token):
         """Test that secrets can be enumerated with a full access token."""
         # Run Glato with secret enumeration flags
-        result = run_glato(["-u", gitlab_url, "--enumerate-projects", "--enumerate-secrets"], 
-                          token=alice_token)
-        
-        # Check for secret enumeration indicators in the output
-        assert "found" in result.stdout.lower() and "project variable" in result.stdout.lower(), "Project variable information not found"
-        
-        # Test for specific secrets we expect to find
-        assert "digitalocean_access_token" in result.stdout.lower(), "DigitalOcean access token not found"
-        assert "aws_access_key_id" in result.stdout.lower(), "AWS access key not found"
-        assert "aws_secret_access_key" in result.stdout.lower(), "AWS secret key not found"
-        
-        # Check for protection status indicators
-        assert "protected" in result.stdout.lower(), "Protected variable indicators not found"
-        assert "masked" in result.stdout.lower(), "Masked variable indicators not found"
-        
-        # Check for specific project secrets
-        assert "infrastructure-glato" in result.stdout.lower(), "Infrastructure project not found"
-        assert "security-scanner-glato" in result.stdout.lower(), "Security scanner project not found"
+        result = glato_runner(["-u", gitlab_url, "--enumerate-projects", "--enumerate-secrets"], 
+                              token=alice_token)
         
-        # Verify secrets from different domains
-        assert "firebase_token" in result.stdout.lower(), "Firebase token not found"
-        assert "github_token" in result.stdout.lower(), "GitHub token not found"
-        assert "slack_webhook_url" in result.stdout.lower(), "Slack webhook URL not found"
-        assert "vault_token" in result.stdout.lower(), "Vault token not found"
-        assert "tf_api_token" in result.stdout.lower(), "Terraform API token not found"
+        # Secrets, protection flags and projects are all checked in one scan
+        missing = missing_from(result.lower_stdout, FULL_ACCESS_SECRETS_OUTPUT)
+        assert not missing, f"Expected secret enumeration output not found: {sorted(missing)}"
     
-    def test_secret_formats_and_protection(self, gitlab_url, alice_token):
+    def test_secret_formats_and_protection(self, glato_runner, gitlab_url, alice_token):
         """Test that secrets have proper formatting and protection statuses."""
-        result = run_glato(["-u", gitlab_url, "--enumerate-projects", "--enumerate-secrets"], 
-                          token=alice_token)
+        result = glato_runner(["-u", gitlab_url, "--enumerate-projects", "--enumerate-secrets"], 
+                              token=alice_token)
         
-        # Check for AWS credential format 
-        assert "akia" in result.stdout.lower(), "AWS Access Key format not found"
+        output_lower = result.lower_stdout
         
-        # Check for token formats
-        assert "ghp_" in result.stdout.lower(), "GitHub token format not found"
-        assert "dop_v1_" in result.stdout.lower(), "DigitalOcean token format not found"
-        assert "tfc-token-" in result.stdout.lower(), "Terraform Cloud token format not found"
+        # Check for AWS, GitHub, DigitalOcean and Terraform Cloud credential formats
+        missing = missing_from(output_lower, SECRET_VALUE_PREFIXES)
+        assert not missing, f"Secret value formats not found: {sorted(missing)}"
         
         # Verify that sensitive variables are protected/masked
-        aws_section = result.stdout.lower().split("aws_secret_access_key")[1].split("project:")[0]
-        assert "protected" in aws_section and "masked" in aws_section, "AWS secret key is not properly protected and masked"
+        aws_section = _AWS_SECRET_SECTION_RE.search(output_lower)
+        assert aws_section, "AWS secret key not found"
+        assert "protected" in aws_section[1] and "masked" in aws_section[1], "AWS secret key is not properly protected and masked"
         
         # Verify that tokens have appropriate security settings
-        tf_section = result.stdout.lower().split("tf_api_token")[1].split("vault_token")[0]
-        assert "protected" in tf_section and "masked" in tf_section, "Terraform API token is not properly protected and masked"
+        tf_section = _TF_TOKEN_SECTION_RE.search(output_lower)
+        assert tf_section, "Terraform API token not found"
+        assert "protected" in tf_section[1] and "masked" in tf_section[1], "Terraform API token is not properly protected and masked"
     
-    def test_limited_access_secret_enumeration(self, gitlab_url, bob_token):
+    def test_limited_access_secret_enumeration(self, glato_runner, gitlab_url, bob_token):
         """Test that secrets enumeration is restricted with limited scope token."""
         # The command may succeed but should indicate limited permissions
-        result = run_glato(["-u", gitlab_url, "--enumerate-projects", "--enumerate-secrets"], 
-                          token=bob_token)
+        result = glato_runner(["-u", gitlab_url, "--enumerate-projects", "--enumerate-secrets"], 
+                              token=bob_token)
         
         # Check for error message indicating limited permissions
-        assert "error:" in result.stdout.lower() or "scope required" in result.stdout.lower(), "Expected message about limited permissions not found"
+        assert "error:" in result.lower_stdout or "scope required" in result.lower_stdout, "Expected message about limited permissions not found"
     
-    def test_departmental_secrets_access(self, gitlab_url, frank_token):
+    def test_departmental_secrets_access(self, glato_runner, gitlab_url, frank_token):
         """Test that DevOps user can access infrastructure secrets."""
-        result = run_glato(["-u", gitlab_url, "--enumerate-projects", "--enumerate-secrets"], 
-                          token=frank_token)
+        result = glato_runner(["-u", gitlab_url, "--enumerate-projects", "--enumerate-secrets"], 
+                              token=frank_token)
         
         # Check that Frank can see DevOps infrastructure secrets
-        assert "infrastructure-glato" in result.stdout.lower(), "Infrastructure project not found"
+        assert "infrastructure-glato" in result.lower_stdout, "Infrastructure project not found"
         # Check that Frank can see some secrets but not others based on department
-        assert "digitalocean_access_token" in result.stdout.lower() or "aws_" in result.stdout.lower(), "Expected DevOps secrets not found"
+        assert "digitalocean_access_token" in result.lower_stdout or "aws_" in result.lower_stdout, "Expected DevOps secrets not found"
 
 
+@pytest.mark.xdist_group("secrets")
 class TestSelfEnumeration:
     """Test cases for self enumeration functionality."""
     
-    def test_self_enumeration_with_full_access(self, gitlab_url, alice_token):
+    def test_self_enumeration_with_full_access(self, glato_runner, gitlab_url, alice_token):
         """Test that self enumeration works with a full access token."""
-        result = run_glato(["-u", gitlab_url, "--self-enumeration"], token=alice_token)
+        result = glato_runner(["-u", gitlab_url, "--self-enumeration"], token=alice_token)
         
         # Check that various parts of the output are present
         assert result.returncode == 0, "Self enumeration failed"
-        assert "alice" in result.stdout.lower(), "Username not found" 
\ No newline at end of file
+        assert "alice" in result.lower_stdout, "Username not found" 
\ No newline at end of file
@@ -6,100 +6,55 @@ focusing on the differences from SaaS behavior like including non-member project
 """
 
 import pytest
-import subprocess
-import os
+import re
 import time
+from collections import Counter
 from pathlib import Path
 
+from glato.enumerate.enumerate import is_saas_url
 
-def run_glato(args, token=None):
-    """Run glato command with proper environment setup."""
-    cmd = ["glato"]
-    cmd.extend(args)
-    
-    env = os.environ.copy()
-    if token:
-        env["GL_TOKEN"] = token
-    
-    result = subprocess.run(
-        cmd,
-        env=env,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
-    )
-    
-    return result
+from ._glato_runner import LineCounter, contains_any, run_glato_inproc, run_glato_stream
 
 
-def run_glato_with_timeout(args, token=None, timeout=300):
-    """Run glato command with timeout."""
-    cmd = ["glato"]
-    cmd.extend(args)
-    
-    env = os.environ.copy()
-    if token:
-        env["GL_TOKEN"] = token
-    
-    try:
-        result = subprocess.run(
-            cmd,
-            env=env,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=timeout
-        )
-    except subprocess.TimeoutExpired as e:
-        # Create a mock result object for timeout cases
-        class TimeoutResult:
-            def __init__(self, stdout, stderr):
-                self.returncode = 124  # Standard timeout exit code
-                self.stdout = stdout.decode() if isinstance(stdout, bytes) else (stdout or "")
-                self.stderr = stderr.decode() if isinstance(stderr, bytes) else (stderr or "")
-        
-        result = TimeoutResult(e.stdout, e.stderr)
-    
-    return result
+_BOB_RE = re.compile("bob", re.IGNORECASE)
+_PROJECT_LINE_RE = re.compile(r"^[ \t]*project: ", re.MULTILINE | re.IGNORECASE)
+
+# A project header and the first "Access Level:" line before the next project
+_PROJECT_ACCESS_RE = re.compile(
+    r"^[ \t]*project: (.*)\n(?:(?![ \t]*project: ).*\n)*?.*access level:(.*)$",
+    re.MULTILINE | re.IGNORECASE
+)
+
+
+def parse_access_levels(output):
+    """Return a {"name", "access_level"} dict, lowercased, for each project showing an access level."""
+    return [
+        {"name": m.group(1).strip().lower(), "access_level": m.group(2).strip().lower()}
+        for m in _PROJECT_ACCESS_RE.finditer(output)
+    ]
 
 
 def is_gitlab_saas(gitlab_url: str) -> bool:
     """Detect if GitLab URL is SaaS (gitlab.com) or self-hosted."""
-    try:
-        from glato.enumerate.enumerate import Enumerator
-        
-        class MockAPI:
-            def __init__(self, gitlab_url):
-                self.gitlab_url = gitlab_url
-        
-        enumerator = Enumerator(gitlab_url=gitlab_url)
-        enumerator.api = MockAPI(gitlab_url)
-        return enumerator._is_gitlab_saas()
-    except Exception:
-        # Fallback detection
-        return "gitlab.com" in gitlab_url.lower()
+    return is_saas_url(gitlab_url)
 
 
+@pytest.mark.selfhosted
+@pytest.mark.xdist_group("projects")
 class TestSelfHostedProjectEnumeration:
     """Test project enumeration functionality specifically on self-hosted GitLab."""
 
-    def test_selfhosted_basic_enumeration(self, gitlab_url, alice_token):
+    def test_selfhosted_basic_enumeration(self, glato_runner, gitlab_url, alice_token):
         """Test basic project enumeration on self-hosted GitLab."""
-        if is_gitlab_saas(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
-        result = run_glato(["-u", gitlab_url, "--enumerate-projects"], token=alice_token)
+        result = glato_runner(["-u", gitlab_url, "--enumerate-projects"], token=alice_token)
         
         assert result.returncode == 0, "Self-hosted project enumeration should succeed"
         self._validate_project_enumeration_output(result.stdout)
         print("✅ Self-hosted project enumeration completed successfully")
 
-    def test_selfhosted_includes_non_member_projects(self, gitlab_url, alice_token):
+    def test_selfhosted_includes_non_member_projects(self, glato_runner, gitlab_url, alice_token):
         """Test that self-hosted includes non-member public projects."""
-        if is_gitlab_saas(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
-        result = run_glato(["-u", gitlab_url, "--enumerate-projects"], token=alice_token)
+        result = glato_runner(["-u", gitlab_url, "--enumerate-projects"], token=alice_token)
         
         assert result.returncode == 0, "Project enumeration should succeed"
         
@@ -112,16 +67,13 @@ class TestSelfHostedProjectEnumeration:
             
         print("✅ Self-hosted correctly includes non-member public projects")
 
-    def test_selfhosted_environment_detection(self, gitlab_url, alice_token):
+    def test_selfhosted_environment_detection(self, glato_runner, gitlab_url, alice_token):
         """Test that self-hosted environment is correctly detected."""
-        if is_gitlab_saas(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
         # Verify detection function works correctly
         assert not is_gitlab_saas(gitlab_url), \
             f"URL {gitlab_url} should be detected as self-hosted, not SaaS"
         
-        result = run_glato(["-u", gitlab_url, "--enumerate-projects"], token=alice_token)
+        result = glato_runner(["-u", gitlab_url, "--enumerate-projects"], token=alice_token)
         
         # Should NOT have SaaS-specific messages
         saas_indicators = [
@@ -129,9 +81,7 @@ class TestSelfHostedProjectEnumeration:
             "gitlab saas detected"
         ]
         
-        has_saas_behavior = any(
-            indicator in result.stdout.lower() for indicator in saas_indicators
-        )
+        has_saas_behavior = contains_any(result.stdout, *saas_indicators)
         
         assert not has_saas_behavior, \
             "Self-hosted instance should not show SaaS-specific behavior"
@@ -140,16 +90,16 @@ class TestSelfHostedProjectEnumeration:
 
     def test_selfhosted_performance_characteristics(self, gitlab_url, alice_token):
         """Test self-hosted project enumeration performance."""
-        if is_gitlab_saas(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
-        start_time = time.time()
-        result = run_glato(["-u", gitlab_url, "--enumerate-projects"], token=alice_token)
-        duration = time.time() - start_time
+        # Count project lines as glato prints them rather than keeping the output
+        projects = LineCounter("Project: ")
+        start_time = time.monotonic()
+        result = run_glato_inproc(["-u", gitlab_url, "--enumerate-projects"], token=alice_token,
+                                  stdout=projects)
+        duration = time.monotonic() - start_time
         
         assert result.returncode == 0, "Self-hosted enumeration should succeed"
         
-        project_count = result.stdout.lower().count("project: ")
+        project_count = projects.count
         rate = project_count / duration if duration > 0 else 0
         
         print(f"Self-hosted enumerated {project_count} projects in {duration:.1f}s ({rate:.1f} projects/sec)")
@@ -159,88 +109,61 @@ class TestSelfHostedProjectEnumeration:
         else:
             print("✅ Good performance on self-hosted")
 
-    def test_selfhosted_access_level_validation(self, gitlab_url, alice_token):
+    def test_selfhosted_access_level_validation(self, glato_runner, gitlab_url, alice_token):
         """Test that access levels are properly identified on self-hosted."""
-        if is_gitlab_saas(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
-        result = run_glato(["-u", gitlab_url, "--enumerate-projects"], token=alice_token)
+        result = glato_runner(["-u", gitlab_url, "--enumerate-projects"], token=alice_token)
         
         assert result.returncode == 0, "Project enumeration should succeed"
         self._validate_access_levels(result.stdout)
 
     def test_selfhosted_limited_token_access(self, gitlab_url, bob_token):
         """Test project enumeration with limited self-hosted token."""
-        if is_gitlab_saas(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
-        result = run_glato(["-u", gitlab_url, "--enumerate-projects"], token=bob_token)
+        # Runs the installed console script, so the CLI packaging is smoke-tested too.
+        # Output is scanned line by line as it arrives instead of being buffered.
+        result = run_glato_stream(["-u", gitlab_url, "--enumerate-projects"], token=bob_token,
+                                  patterns={"bob": _BOB_RE})
         
         if result.returncode == 0:
-            assert "bob" in result.stdout.lower(), "Should show Bob's user info"
+            assert "bob" in result.found, "Should show Bob's user info"
             print("✅ Limited token project enumeration completed on self-hosted")
         else:
-            print(f"⚠️  Limited token had expected limitations: {result.stderr}")
+            print(f"⚠️  Limited token had expected limitations (exit code {result.returncode})")
 
-    def test_selfhosted_comprehensive_enumeration(self, gitlab_url, alice_token):
+    def test_selfhosted_comprehensive_enumeration(self, glato_runner, gitlab_url, alice_token):
         """Test comprehensive project enumeration behavior on self-hosted."""
-        if is_gitlab_saas(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
-        result = run_glato(["-u", gitlab_url, "--enumerate-projects"], token=alice_token)
+        result = glato_runner(["-u", gitlab_url, "--enumerate-projects"], token=alice_token)
         
         assert result.returncode == 0, "Project enumeration should succeed"
         
-        output_lines = result.stdout.lower().split('\n')
-        
         # Parse projects and their access levels
-        projects_found = []
-        current_project = None
-        
-        for line in output_lines:
-            if line.strip().startswith("project: "):
-                current_project = line.split("project: ")[1].strip()
-            elif "access level:" in line and current_project:
-                access_level = line.split("access level:")[1].strip()
-                projects_found.append({
-                    "name": current_project,
-                    "access_level": access_level
-                })
-                current_project = None
+        projects_found = parse_access_levels(result.stdout)
         
         # Verify we found some projects
         assert len(projects_found) > 0, "Should find at least some projects on self-hosted"
         
         # On self-hosted, we should be able to see both member and non-member projects
+        access_distribution = Counter(p["access_level"] for p in projects_found)
         member_access_levels = ["owner", "maintainer", "developer", "reporter", "guest"]
-        member_projects = [p for p in projects_found if p["access_level"] in member_access_levels]
-        non_member_projects = [p for p in projects_found if p["access_level"] == "not a member"]
+        member_projects = sum(access_distribution[level] for level in member_access_levels)
+        non_member_projects = access_distribution["not a member"]
         
         # Report the access level distribution
-        access_distribution = {}
-        for project in projects_found:
-            level = project["access_level"]
-            access_distribution[level] = access_distribution.get(level, 0) + 1
-        
         print(f"✅ Found {len(projects_found)} projects on self-hosted GitLab:")
         for level, count in access_distribution.items():
             print(f"  - {level}: {count} projects")
         
         # Verify we have a mix of access levels (characteristic of self-hosted)
         total_projects = len(projects_found)
-        if len(member_projects) == total_projects:
+        if member_projects == total_projects:
             print("✅ All projects are member projects (expected for limited self-hosted setup)")
-        elif len(non_member_projects) > 0:
-            print(f"✅ Found {len(non_member_projects)} non-member projects (expected self-hosted behavior)")
+        elif non_member_projects > 0:
+            print(f"✅ Found {non_member_projects} non-member projects (expected self-hosted behavior)")
         
         print("✅ Self-hosted comprehensive enumeration completed successfully")
 
     def test_selfhosted_branch_protection_enumeration(self, gitlab_url, alice_token):
         """Test branch protection enumeration on self-hosted."""
-        if is_gitlab_saas(gitlab_url):
-            pytest.skip("Self-hosted test requires self-hosted GitLab environment")
-            
-        result = run_glato([
+        result = run_glato_inproc([
             "-u", gitlab_url,
             "--enumerate-projects", 
             "--check-branch-protections"
@@ -253,33 +176,17 @@ class TestSelfHostedProjectEnumeration:
 
     def _validate_project_enumeration_output(self, output: str):
         """Validate project enumeration output format."""
-        output_lines = output.lower().split('\n')
-        
-        project_lines = [line for line in output_lines if line.strip().startswith("project: ")]
-        assert len(project_lines) > 0, "Should find at least some projects"
+        project_count = len(_PROJECT_LINE_RE.findall(output))
+        assert project_count > 0, "Should find at least some projects"
         
-        has_user_info = any("username:" in line or "user id:" in line for line in output_lines)
+        has_user_info = contains_any(output, "username:", "user id:")
         assert has_user_info, "Should contain user information"
         
-        print(f"✅ Project enumeration output validated: {len(project_lines)} projects found")
+        print(f"✅ Project enumeration output validated: {project_count} projects found")
 
     def _validate_access_levels(self, output: str):
         """Validate access level information in self-hosted project enumeration output."""
-        output_lines = output.lower().split('\n')
-        
-        projects_with_access = []
-        current_project = None
-        
-        for line in output_lines:
-            if line.strip().startswith("project: "):
-                current_project = line.split("project: ")[1].strip()
-            elif "access level:" in line and current_project:
-                access_level = line.split("access level:")[1].strip()
-                projects_with_access.append({
-                    "name": current_project,
-                    "access_level": access_level
-                })
-                current_project = None
+        projects_with_access = parse_access_levels(output)
         
         assert len(projects_with_access) > 0, "Should find projects with access level information"
         
@@ -289,10 +196,7 @@ class TestSelfHostedProjectEnumeration:
                 f"Invalid access level: {project['access_level']}"
         
         # Report access level distribution
-        access_distribution = {}
-        for project in projects_with_access:
-            level = project["access_level"]
-            access_distribution[level] = access_distribution.get(level, 0) + 1
+        access_distribution = Counter(p["access_level"] for p in projects_with_access)
         
         print(f"✅ Self-hosted access level validation completed: {len(projects_with_access)} projects")
         for level, count in access_distribution.items():
@@ -300,7 +204,7 @@ class TestSelfHostedProjectEnumeration:
         
         # Self-hosted specific validation
         member_levels = ["owner", "maintainer", "developer", "reporter", "guest"]
-        member_projects = sum(access_distribution.get(level, 0) for level in member_levels)
-        non_member_projects = access_distribution.get("not a member", 0)
+        member_projects = sum(access_distribution[level] for level in member_levels)
+        non_member_projects = access_distribution["not a member"]
         
         print(f"✅ Self-hosted: {member_projects} member projects, {non_member_projects} non-member projects")
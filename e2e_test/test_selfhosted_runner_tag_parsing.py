@@ -5,9 +5,11 @@ This module tests the runner tag parsing feature against real self-hosted GitLab
 that were specifically created with diverse GitLab CI configurations.
 """
 
+import functools
 import os
 import pytest
 import time
+from concurrent.futures import ThreadPoolExecutor
 from glato.enumerate.enumerate import Enumerator
 from glato.gitlab.workflow_parser import WorkflowSecretParser
 
@@ -40,36 +42,78 @@ class TestRunnerTagParsingReal:
     }
 
 
+@pytest.mark.xdist_group("runner_tags")
 class TestSelfHostedRunnerTagParsingReal(TestRunnerTagParsingReal):
     """Self-hosted GitLab real infrastructure tests."""
     
-    @pytest.fixture(autouse=True)
-    def setup(self, gitlab_url, tokens):
-        """Set up test environment for self-hosted testing."""
+    @pytest.fixture(scope="class")
+    @classmethod
+    def selfhosted_env(cls, resolve_token):
+        """Return the self-hosted URL and admin token (or Alice's), skipping if unset."""
         # For self-hosted tests, use the specific self-hosted URL
-        self.gitlab_url = os.getenv('SELF_HOSTED_GITLAB_URL', '').rstrip('/')
-        self.token = (
-            tokens.get('SELF_HOSTED_ADMIN_TOKEN') or 
-            tokens.get('SELF_HOSTED_ALICE_TOKEN') or
+        gitlab_url = os.getenv('SELF_HOSTED_GITLAB_URL', '').rstrip('/')
+        token = (
+            resolve_token('SELF_HOSTED_ADMIN_TOKEN') or 
+            resolve_token('SELF_HOSTED_ALICE_TOKEN') or
             os.getenv("SELF_HOSTED_ADMIN_TOKEN") or
             os.getenv("SELF_HOSTED_ALICE_TOKEN")
         )
         
-        if not self.gitlab_url or not self.token:
+        if not gitlab_url or not token:
             pytest.skip("Self-hosted GitLab environment not configured")
+        return gitlab_url, token
+    
+    @pytest.fixture(scope="class")
+    @classmethod
+    def enumerator(cls, selfhosted_env):
+        """One Enumerator for the class, so its API client and connections are reused."""
+        gitlab_url, token = selfhosted_env
+        return Enumerator(token=token, gitlab_url=gitlab_url)
+    
+    @pytest.fixture(scope="class")
+    @classmethod
+    def parser(cls, enumerator):
+        """A workflow parser on the shared enumerator's API client."""
+        return WorkflowSecretParser(enumerator.api)
+    
+    @pytest.fixture(scope="class")
+    @classmethod
+    def parse_workflow(cls, parser):
+        """Return ``parse_workflow_yaml`` memoised by content for the class.
+
+        The parsed trees are shared between tests and must not be modified.
+        """
+        return functools.lru_cache(maxsize=None)(parser.parse_workflow_yaml)
+    
+    @pytest.fixture(scope="class")
+    @classmethod
+    def prefetched_workflows(cls, parser):
+        """Fetch the tested projects' .gitlab-ci.yml into the API cache concurrently.
+
+        The tests then read the workflows from the shared client's file cache
+        instead of fetching them from GitLab one after another.
+        """
+        keys = ('basic', 'advanced')
+        with ThreadPoolExecutor(max_workers=len(keys)) as executor:
+            futures = {
+                key: executor.submit(parser.get_workflow_file,
+                                     cls.SELFHOSTED_PROJECTS[key]['id'], path='.gitlab-ci.yml')
+                for key in keys
+            }
+            return {key: future.result() for key, future in futures.items()}
+    
+    @pytest.fixture(autouse=True)
+    def setup(self, selfhosted_env):
+        """Set up test environment for self-hosted testing."""
+        self.gitlab_url, self.token = selfhosted_env
         
         print(f"🔧 Setup complete for self-hosted runner tag parsing tests")
         print(f"   URL: {self.gitlab_url}")
 
-    def test_basic_runner_tag_parsing_selfhosted(self, capsys):
+    def test_basic_runner_tag_parsing_selfhosted(self, enumerator, prefetched_workflows, capsys):
         """Test basic runner tag parsing with real self-hosted project."""
         print("🧪 Testing basic runner tag parsing on real self-hosted project...")
         
-        enumerator = Enumerator(
-            token=self.token,
-            gitlab_url=self.gitlab_url
-        )
-        
         project_id = self.SELFHOSTED_PROJECTS['basic']['id']
         enumerator._analyze_workflow_runner_requirements(project_id)
         
@@ -87,15 +131,10 @@ class TestSelfHostedRunnerTagParsingReal(TestRunnerTagParsingReal):
         
         print("✅ Self-hosted basic runner tag parsing test passed")
 
-    def test_advanced_runner_tag_parsing_selfhosted(self, capsys):
+    def test_advanced_runner_tag_parsing_selfhosted(self, enumerator, prefetched_workflows, capsys):
         """Test advanced runner tag parsing on self-hosted."""
         print("🧪 Testing advanced runner tag parsing on self-hosted...")
         
-        enumerator = Enumerator(
-            token=self.token,
-            gitlab_url=self.gitlab_url
-        )
-        
         project_id = self.SELFHOSTED_PROJECTS['advanced']['id']
         enumerator._analyze_workflow_runner_requirements(project_id)
         
@@ -109,15 +148,10 @@ class TestSelfHostedRunnerTagParsingReal(TestRunnerTagParsingReal):
         
         print("✅ Self-hosted advanced runner tag parsing test passed")
 
-    def test_workflow_parser_direct_selfhosted(self):
+    def test_workflow_parser_direct_selfhosted(self, parser, prefetched_workflows, parse_workflow):
         """Test workflow parser directly against self-hosted project."""
         print("🧪 Testing workflow parser directly on self-hosted...")
         
-        from glato.gitlab.api import Api
-        
-        api = Api(pat=self.token, gitlab_url=self.gitlab_url)
-        parser = WorkflowSecretParser(api)
-        
         project_id = self.SELFHOSTED_PROJECTS['basic']['id']
         workflow_content = parser.get_workflow_file(project_id, path='.gitlab-ci.yml')
         
@@ -125,13 +159,12 @@ class TestSelfHostedRunnerTagParsingReal(TestRunnerTagParsingReal):
         assert "build_job:" in workflow_content, "Should contain build_job"
         
         # Parse and extract tags
-        parsed_yaml = parser.parse_workflow_yaml(workflow_content)
+        parsed_yaml = parse_workflow(workflow_content)
         runner_tags = parser.extract_runner_tags(parsed_yaml, '.gitlab-ci.yml')
         
         assert len(runner_tags) > 0, "Should extract runner tags"
         
         print(f"✅ Self-hosted direct parser test passed - found {len(runner_tags)} tags")
 
-
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
\ No newline at end of file
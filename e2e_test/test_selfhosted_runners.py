@@ -7,120 +7,169 @@ focusing on self-hosted-specific runner configurations and behaviors.
 
 import os
 import requests
-import time
 import pytest
-import urllib.parse
 import uuid
-from pathlib import Path
-from git import Repo
 import json
 
+from ._pipeline_runner import PipelineRunnerMixin, get_ci_commit_base, retrying_session
 
-class TestSelfHostedRunners:
+
+# Group whose runners the group runner checks look at
+GROUP_PATH = "acme-corporation-glato/product-glato"
+
+# Looks up the test project and group IDs in one request
+IDS_QUERY = """
+query($project: ID!, $group: ID!) {
+  project(fullPath: $project) { id }
+  group(fullPath: $group) { id }
+}
+"""
+
+
+# Unverified requests would otherwise warn on every call. The pipelines run
+# one after another on one worker, so a self-hosted instance with few runners
+# is not asked to run them all at once.
+@pytest.mark.filterwarnings("ignore::urllib3.exceptions.InsecureRequestWarning")
+@pytest.mark.xdist_group("selfhosted_runners")
+class TestSelfHostedRunners(PipelineRunnerMixin):
     """GitLab Runner tests specifically for self-hosted environments."""
     
-    @pytest.fixture(autouse=True)
-    def setup(self, gitlab_url, tokens):
-        """Set up test environment for self-hosted testing."""
-        self.gitlab_url = gitlab_url
-        
-        # Self-hosted token configuration
-        self.token = (
-            tokens.get('SELF_HOSTED_ADMIN_TOKEN') or
-            tokens.get('SELF_HOSTED_ALICE_TOKEN') or 
+    # Self-hosted project configuration
+    project_path = "acme-corporation-glato/product-glato/api-glato/api-service-glato"
+    
+    @pytest.fixture(scope="class")
+    @classmethod
+    def selfhosted_token(cls, resolve_token):
+        """Return the self-hosted token used for API calls."""
+        token = (
+            resolve_token('SELF_HOSTED_ADMIN_TOKEN') or
+            resolve_token('SELF_HOSTED_ALICE_TOKEN') or 
             os.getenv("SELF_HOSTED_ADMIN_TOKEN") or
             os.getenv("SELF_HOSTED_ALICE_TOKEN") or
             # Legacy fallback
             os.getenv("TF_VAR_gitlab_token") or
-            tokens.get('GITLAB_TOKEN') or 
+            resolve_token('GITLAB_TOKEN') or 
             os.getenv("GITLAB_TOKEN")
         )
-        assert self.token, ("Self-hosted token required. Set SELF_HOSTED_ADMIN_TOKEN or "
-                           "SELF_HOSTED_ALICE_TOKEN for self-hosted testing")
-        
-        # Self-hosted project configuration  
-        self.project_path = "acme-corporation-glato/product-glato/api-glato/api-service-glato"
-        
-        # Get project and group IDs dynamically
-        self._get_selfhosted_ids()
-        
-        # Set up headers for self-hosted
-        self.headers = {"PRIVATE-TOKEN": self.token, "Content-Type": "application/json"}
+        assert token, ("Self-hosted token required. Set SELF_HOSTED_ADMIN_TOKEN or "
+                       "SELF_HOSTED_ALICE_TOKEN for self-hosted testing")
+        return token
+    
+    @pytest.fixture(scope="class")
+    @classmethod
+    def session(cls, selfhosted_token):
+        """One retrying HTTP session for the class, authenticated as the test user."""
+        # Self-hosted test instances usually serve self-signed
+        # certificates; a CA bundle turns verification back on
+        verify = os.getenv("GLATO_CA_BUNDLE") or False
+        headers = {"PRIVATE-TOKEN": selfhosted_token, "Content-Type": "application/json"}
+        with retrying_session(verify, headers) as session:
+            yield session
+    
+    @pytest.fixture(scope="class")
+    @classmethod
+    def selfhosted_ids(cls, session, selfhosted_gitlab_url):
+        """Return the test project and group IDs, looked up once per class."""
+        return cls._get_selfhosted_ids(session, selfhosted_gitlab_url)
+    
+    @pytest.fixture(scope="class")
+    @classmethod
+    def ci_commit_base(cls, session, selfhosted_gitlab_url, selfhosted_ids):
+        """Return the default branch and CI file action, looked up once per class."""
+        return get_ci_commit_base(session, f"{selfhosted_gitlab_url}/api/v4/projects/{selfhosted_ids[0]}")
+    
+    @pytest.fixture(autouse=True)
+    def setup(self, gitlab_url, selfhosted_token, session, selfhosted_ids, ci_commit_base):
+        """Set up test environment for self-hosted testing."""
+        self.gitlab_url = gitlab_url
+        self.token = selfhosted_token
+        self.session = session
+        self.project_id, self.group_id = selfhosted_ids
+        self.default_branch, self.ci_file_action = ci_commit_base
         
         # Generate unique test ID for isolation
         self.test_id = str(uuid.uuid4())[:8]
         
+        # Jobs of finished pipelines, by pipeline ID
+        self._pipeline_jobs = {}
+        
         print(f"🔧 Setup complete for self-hosted project {self.project_id} (test ID: {self.test_id})")
 
-    def _get_selfhosted_ids(self):
-        """Get project and group IDs for self-hosted environment."""
+    @classmethod
+    def _get_selfhosted_ids(cls, session, gitlab_url):
+        """Get project and group IDs for self-hosted environment.
+        
+        Both are looked up with one GraphQL request; the REST endpoints are
+        only used if GraphQL does not return them.
+        """
+        ids = cls._get_selfhosted_ids_graphql(session, gitlab_url)
+        if ids:
+            return ids
+        
         # Get project ID
-        response = requests.get(
-            f"{self.gitlab_url}/api/v4/projects/{self.project_path.replace('/', '%2F')}",
-            headers={"PRIVATE-TOKEN": self.token},
-            verify=False
+        response = session.get(
+            f"{gitlab_url}/api/v4/projects/{cls.project_path.replace('/', '%2F')}"
         )
         assert response.status_code == 200, f"Failed to get project info: {response.status_code} - {response.text}"
-        project_info = response.json()
-        self.project_id = str(project_info["id"])
+        project_id = str(response.json()["id"])
         
         # Get product group ID
-        response = requests.get(
-            f"{self.gitlab_url}/api/v4/groups/acme-corporation-glato%2Fproduct-glato",
-            headers={"PRIVATE-TOKEN": self.token},
-            verify=False
+        response = session.get(
+            f"{gitlab_url}/api/v4/groups/{GROUP_PATH.replace('/', '%2F')}"
         )
         assert response.status_code == 200, f"Failed to get product group info: {response.status_code}"
-        group_info = response.json()
-        self.group_id = str(group_info["id"])
+        group_id = str(response.json()["id"])
+        return project_id, group_id
+
+    @classmethod
+    def _get_selfhosted_ids_graphql(cls, session, gitlab_url):
+        """Return ``(project_id, group_id)`` from a single GraphQL request, or None."""
+        try:
+            response = session.post(
+                f"{gitlab_url}/api/graphql",
+                json={"query": IDS_QUERY, "variables": {"project": cls.project_path, "group": GROUP_PATH}}
+            )
+            data = response.json().get("data") or {}
+        except (requests.exceptions.RequestException, ValueError):
+            return None
+        
+        project, group = data.get("project"), data.get("group")
+        if not (project and group):
+            return None
+        # GraphQL IDs are global, e.g. gid://gitlab/Project/123
+        return project["id"].rsplit("/", 1)[-1], group["id"].rsplit("/", 1)[-1]
 
     def test_runners_are_online(self):
         """Test that required runners are online and properly configured on self-hosted."""
         print("🔍 Testing self-hosted runner availability...")
         
         # Check project runners
-        response = requests.get(
-            f"{self.gitlab_url}/api/v4/projects/{self.project_id}/runners",
-            headers=self.headers,
-            verify=False
+        status_code, online_project_runners = self._count_runners(
+            f"{self.gitlab_url}/api/v4/projects/{self.project_id}/runners", status="online"
         )
-        assert response.status_code == 200, f"Failed to get project runners: {response.status_code}"
-        
-        project_runners = response.json()
+        assert status_code == 200, f"Failed to get project runners: {status_code}"
         
         # Self-hosted runners - check project, group, and instance runners
-        online_project_runners = [r for r in project_runners if r.get("status") == "online"]
-        assert len(online_project_runners) >= 1, "At least 1 project runner should be online on self-hosted"
+        assert online_project_runners >= 1, "At least 1 project runner should be online on self-hosted"
         
         # Check group runners
-        response = requests.get(
-            f"{self.gitlab_url}/api/v4/groups/{self.group_id}/runners",
-            headers=self.headers,
-            verify=False
+        status_code, online_group_runners = self._count_runners(
+            f"{self.gitlab_url}/api/v4/groups/{self.group_id}/runners", status="online"
         )
-        if response.status_code == 200:
-            group_runners = response.json()
-            online_group_runners = [r for r in group_runners if r.get("status") == "online"]
-            print(f"✅ Self-hosted group runners online: {len(online_group_runners)}")
+        if status_code == 200:
+            print(f"✅ Self-hosted group runners online: {online_group_runners}")
         
         # Check instance runners (requires admin)
-        response = requests.get(
-            f"{self.gitlab_url}/api/v4/runners/all",
-            headers=self.headers,
-            verify=False
-        )
-        if response.status_code == 403:
+        status_code, _ = self._count_runners(f"{self.gitlab_url}/api/v4/runners/all")
+        if status_code == 403:
             print("⚠️  Admin privileges required to check instance runners")
         
-        print(f"✅ Self-hosted project runners online: {len(online_project_runners)}")
+        print(f"✅ Self-hosted project runners online: {online_project_runners}")
 
     def test_project_runner_execution(self):
         """Test project runner job execution on self-hosted."""
         print("🚀 Testing self-hosted project runner job execution...")
         
-        # Wait to avoid conflicts from previous tests
-        time.sleep(5)
-        
         config = f"""stages:
   - test
 
@@ -158,9 +207,6 @@ project_runner_test_{self.test_id}:
         """Test group runner job execution on self-hosted."""
         print("🚀 Testing self-hosted group runner job execution...")
         
-        # Wait to avoid conflicts
-        time.sleep(5)
-        
         config = f"""stages:
   - test
 
@@ -198,9 +244,6 @@ group_runner_test_{self.test_id}:
         """Test parallel runner job execution on self-hosted."""
         print("🚀 Testing self-hosted parallel runner execution...")
         
-        # Wait to avoid conflicts
-        time.sleep(10)
-        
         config = f"""
 stages:
   - test
@@ -227,10 +270,11 @@ parallel_test_{self.test_id}:
         assert len(jobs) == 2, f"Expected 2 jobs, got {len(jobs)}"
         
         # Verify all jobs succeeded
+        failed = [job for job in jobs if job['status'] != 'success']
+        for job in failed:
+            print(f"❌ Job {job['name']} failed. Details: {job}")
+        self._debug_failed_jobs(failed)
         for job in jobs:
-            if job['status'] != 'success':
-                print(f"❌ Job {job['name']} failed. Details: {job}")
-                self._debug_failed_job(job)
             assert job["status"] == "success", f"Job {job['name']} should succeed, got: {job['status']}"
         
         print("✅ Self-hosted parallel runner execution successful")
@@ -239,10 +283,8 @@ parallel_test_{self.test_id}:
         """Test instance runner availability on self-hosted (if admin access available)."""
         print("🔍 Testing self-hosted instance runner availability...")
         
-        response = requests.get(
-            f"{self.gitlab_url}/api/v4/runners/all",
-            headers=self.headers,
-            verify=False
+        response = self.session.get(
+            f"{self.gitlab_url}/api/v4/runners/all"
         )
         
         if response.status_code == 403:
@@ -259,119 +301,22 @@ parallel_test_{self.test_id}:
         # At least some runners should be available
         assert len(runners) > 0, "No instance runners found on self-hosted"
 
-    def _create_and_wait_for_pipeline(self, config: str, commit_message: str, timeout: int = 120) -> int:
-        """Create a pipeline and wait for completion on self-hosted."""
-        print(f"📝 Creating pipeline: {commit_message}")
-        
-        # Create temporary directory for git operations
-        temp_dir = Path("/tmp") / f"glato_test_{self.test_id}"
-        temp_dir.mkdir(exist_ok=True)
-        
-        try:
-            # Clone the repository
-            clone_url = f"{self.gitlab_url}/{self.project_path}.git"
-            # Add token to URL for authentication
-            auth_url = clone_url.replace("://", f"://oauth2:{self.token}@")
-            repo = Repo.clone_from(auth_url, temp_dir)
-            
-            # Create unique branch
-            branch_name = f"test-runner-{self.test_id}-{int(time.time())}"
-            repo.git.checkout("-b", branch_name)
-            
-            # Write the GitLab CI config
-            ci_file = temp_dir / ".gitlab-ci.yml"
-            ci_file.write_text(config)
-            
-            # Commit and push
-            repo.index.add([".gitlab-ci.yml"])
-            repo.index.commit(commit_message)
-            repo.git.push("origin", branch_name)
-            
-            # Get the pipeline ID
-            time.sleep(5)  # Wait for pipeline creation
-            
-            response = requests.get(
-                f"{self.gitlab_url}/api/v4/projects/{self.project_id}/pipelines",
-                headers=self.headers,
-                params={"ref": branch_name, "per_page": 1},
-                verify=False
-            )
-            assert response.status_code == 200, f"Failed to get pipelines: {response.status_code}"
-            
-            pipelines = response.json()
-            assert len(pipelines) > 0, "No pipeline found"
-            
-            pipeline_id = pipelines[0]["id"]
-            print(f"📋 Pipeline created: {pipeline_id}")
-            
-            # Wait for pipeline completion
-            start_time = time.time()
-            while time.time() - start_time < timeout:
-                response = requests.get(
-                    f"{self.gitlab_url}/api/v4/projects/{self.project_id}/pipelines/{pipeline_id}",
-                    headers=self.headers,
-                    verify=False
-                )
-                assert response.status_code == 200, f"Failed to get pipeline status: {response.status_code}"
-                
-                pipeline = response.json()
-                status = pipeline["status"]
-                
-                print(f"🔄 Pipeline {pipeline_id} status: {status}")
-                
-                if status in ["success", "failed", "canceled", "skipped"]:
-                    if status != "success":
-                        self._debug_failed_pipeline(pipeline_id)
-                    return pipeline_id
-                
-                time.sleep(10)
-            
-            raise TimeoutError(f"Pipeline {pipeline_id} did not complete within {timeout} seconds")
-            
-        finally:
-            # Cleanup
-            try:
-                if 'repo' in locals():
-                    # Delete the test branch
-                    repo.git.push("origin", f":{branch_name}")
-            except Exception as e:
-                print(f"⚠️ Cleanup warning: {e}")
-            
-            # Remove temp directory
-            import shutil
-            if temp_dir.exists():
-                shutil.rmtree(temp_dir, ignore_errors=True)
-
-    def _get_pipeline_jobs(self, pipeline_id: int) -> list:
-        """Get jobs for a pipeline on self-hosted."""
-        response = requests.get(
-            f"{self.gitlab_url}/api/v4/projects/{self.project_id}/pipelines/{pipeline_id}/jobs",
-            headers=self.headers,
-            verify=False
-        )
-        assert response.status_code == 200, f"Failed to get pipeline jobs: {response.status_code}"
-        return response.json()
+    def _count_runners(self, url: str, **filters):
+        """Count the runners listed at ``url`` matching ``filters``, e.g. status="online".
+        
+        GitLab filters server-side and reports the total in X-Total, so only
+        one runner is transferred. Returns ``(status_code, count)``; when the
+        header is absent the count is that of the returned page.
+        """
+        response = self.session.get(url, params={**filters, "per_page": 1})
+        if response.status_code != 200:
+            return response.status_code, 0
+        total = response.headers.get("X-Total")
+        return response.status_code, int(total) if total else len(response.json())
 
-    def _debug_failed_job(self, job):
-        """Debug a failed job on self-hosted."""
-        print(f"🔍 Debugging failed job {job['id']}: {job['name']}")
-        
-        # Get job trace
-        response = requests.get(
-            f"{self.gitlab_url}/api/v4/projects/{self.project_id}/jobs/{job['id']}/trace",
-            headers=self.headers,
-            verify=False
+    def _get_job_trace(self, job):
+        """Fetch a job's trace on self-hosted; returns ``(status_code, text)``."""
+        response = self.session.get(
+            f"{self.gitlab_url}/api/v4/projects/{self.project_id}/jobs/{job['id']}/trace"
         )
-        if response.status_code == 200:
-            print(f"📋 Job trace:\n{response.text}")
-        else:
-            print(f"❌ Could not get job trace: {response.status_code}")
-
-    def _debug_failed_pipeline(self, pipeline_id):
-        """Debug a failed pipeline on self-hosted."""
-        print(f"🔍 Debugging failed pipeline {pipeline_id}")
-        
-        jobs = self._get_pipeline_jobs(pipeline_id)
-        for job in jobs:
-            if job["status"] != "success":
-                self._debug_failed_job(job) 
\ No newline at end of file
+        return response.status_code, response.text if response.status_code == 200 else ""
\ No newline at end of file
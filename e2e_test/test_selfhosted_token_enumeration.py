@@ -6,59 +6,50 @@ focusing on self-hosted-specific behaviors and configurations.
 """
 
 import pytest
-import subprocess
-import os
 import time
 
-
-def run_glato(args, token=None, expect_success=True):
-    """Run the glato command with the given arguments."""
-    cmd = ["glato"]
-    cmd.extend(args)
-    
-    env = os.environ.copy()
-    if token:
-        env["GL_TOKEN"] = token
-    
-    result = subprocess.run(
-        cmd,
-        env=env,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        timeout=300  # 5 minutes timeout for API responses
-    )
-    
-    if expect_success and result.returncode != 0:
-        pytest.fail(f"Command failed with exit code {result.returncode}:\n{result.stderr}")
-    
-    return result
+from ._glato_runner import TOKEN_INFO_FIELDS, missing_from, run_glato_checked
 
 
 class TestSelfHostedTokenEnumeration:
-    """Token enumeration tests specifically for self-hosted GitLab."""
+    """Token enumeration tests specifically for self-hosted GitLab.
+
+    Tests that only inspect Alice's ``--enumerate-token`` output share one
+    run through the ``alice_token_result`` fixture.
+    """
+
+    @pytest.fixture(scope="class")
+    @classmethod
+    def alice_token_result(cls, selfhosted_gitlab_url, alice_token):
+        """Run ``--enumerate-token`` as Alice once for the class.
 
-    def test_admin_token_enumeration(self, gitlab_url, alice_token):
+        A failed run is returned rather than failed here, so each test
+        reports it through its own return code assertion.
+        """
+        return run_glato_checked(["-u", selfhosted_gitlab_url, "--enumerate-token"], token=alice_token,
+                                 expect_success=False)
+
+    def test_admin_token_enumeration(self, alice_token_result):
         """Test that admin tokens can be enumerated correctly on self-hosted."""
-        result = run_glato(["-u", gitlab_url, "--enumerate-token"], token=alice_token)
+        result = alice_token_result
         
         assert result.returncode == 0, "Token enumeration should succeed"
-        output_lower = result.stdout.lower()
+        output_lower = result.lower_stdout
         
         # Common validations for self-hosted
         assert "alice" in output_lower, "Alice's username not found"
         assert "api" in output_lower, "API scope not found in token info"
         
         # Validate comprehensive token information
-        required_fields = ["username:", "user id:", "email:", "scopes:", "token name:"]
-        for field in required_fields:
-            assert field in output_lower, f"Required field '{field}' not found in token enumeration output"
+        missing_fields = missing_from(output_lower, TOKEN_INFO_FIELDS)
+        assert not missing_fields, \
+            f"Required fields {sorted(missing_fields)} not found in token enumeration output"
         
         print("✅ Admin token enumeration successful on self-hosted")
 
     def test_limited_token_enumeration(self, gitlab_url, bob_token):
         """Test that limited tokens can be enumerated correctly on self-hosted."""
-        result = run_glato(["-u", gitlab_url, "--enumerate-token"], token=bob_token)
+        result = run_glato_checked(["-u", gitlab_url, "--enumerate-token"], token=bob_token)
         
         assert result.returncode == 0, "Token enumeration should succeed"
         output_lower = result.stdout.lower()
@@ -73,8 +64,8 @@ class TestSelfHostedTokenEnumeration:
     def test_token_scope_limitations(self, gitlab_url, bob_token):
         """Test that token scope limitations are properly identified on self-hosted."""
         # Self-hosted: Test scope limitations - Bob's read_api token should fail for secrets enumeration
-        result = run_glato(["-u", gitlab_url, "--enumerate-projects", "--enumerate-secrets"], 
-                          token=bob_token, expect_success=False)
+        result = run_glato_checked(["-u", gitlab_url, "--enumerate-projects", "--enumerate-secrets"], 
+                                  token=bob_token, expect_success=False)
         
         # Should fail with scope limitation error
         assert result.returncode != 0, "Should fail due to insufficient token scopes"
@@ -91,28 +82,13 @@ class TestSelfHostedTokenEnumeration:
             # If no explicit scope error, check that operations failed gracefully
             print("✅ Token enumeration handled scope limitations gracefully")
 
-    def test_comprehensive_token_information(self, gitlab_url, alice_token):
+    def test_comprehensive_token_information(self, alice_token_result):
         """Test that token enumeration returns comprehensive user and token information on self-hosted."""
-        result = run_glato(["-u", gitlab_url, "--enumerate-token"], token=alice_token)
+        result = alice_token_result
         
         assert result.returncode == 0, "Token enumeration should succeed"
-        output_lines = result.stdout.lower().split('\n')
-        
-        # Required fields validation
-        required_fields = {
-            "username": False,
-            "user id": False,
-            "email": False,
-            "scopes": False,
-            "token name": False
-        }
-        
-        for line in output_lines:
-            for field in required_fields:
-                if field in line:
-                    required_fields[field] = True
-        
-        missing_fields = [field for field, found in required_fields.items() if not found]
+        # Required fields validation, in one scan of the shared lowercased output
+        missing_fields = sorted(missing_from(result.lower_stdout, TOKEN_INFO_FIELDS))
         assert not missing_fields, f"Missing required fields in token information: {missing_fields}"
         
         print("✅ Comprehensive token information validated on self-hosted")
@@ -122,7 +98,7 @@ class TestSelfHostedTokenEnumeration:
         # Test multiple rapid requests
         results = []
         for i in range(3):
-            result = run_glato(["-u", gitlab_url, "--enumerate-token"], token=alice_token)
+            result = run_glato_checked(["-u", gitlab_url, "--enumerate-token"], token=alice_token)
             results.append(result)
             time.sleep(0.5)  # Small delay between requests
         
@@ -136,8 +112,8 @@ class TestSelfHostedTokenEnumeration:
         """Test that invalid tokens are handled gracefully on self-hosted."""
         invalid_token = "invalid_token_12345"
         
-        result = run_glato(["-u", gitlab_url, "--enumerate-token"], 
-                          token=invalid_token, expect_success=False)
+        result = run_glato_checked(["-u", gitlab_url, "--enumerate-token"], 
+                                  token=invalid_token, expect_success=False)
         
         # Should fail with appropriate error
         assert result.returncode != 0, "Invalid token should cause failure"
@@ -150,29 +126,24 @@ class TestSelfHostedTokenEnumeration:
         
         print("✅ Invalid token handled gracefully with appropriate error on self-hosted")
 
-    def test_token_enumeration_output_format(self, gitlab_url, alice_token):
+    def test_token_enumeration_output_format(self, alice_token_result):
         """Test that token enumeration output format is consistent on self-hosted."""
-        result = run_glato(["-u", gitlab_url, "--enumerate-token"], token=alice_token)
+        result = alice_token_result
         
         assert result.returncode == 0, "Token enumeration should succeed"
         
-        # Check for consistent output formatting
-        output_lines = result.stdout.split('\n')
-        
         # Should have structured output with clear sections
-        has_user_section = any("username:" in line.lower() for line in output_lines)
-        has_token_section = any("token name:" in line.lower() for line in output_lines)
-        has_scopes_section = any("scopes:" in line.lower() for line in output_lines)
+        missing = missing_from(result.lower_stdout, TOKEN_INFO_FIELDS)
         
-        assert has_user_section, "User information section not found"
-        assert has_token_section, "Token information section not found"  
-        assert has_scopes_section, "Scopes section not found"
+        assert "username:" not in missing, "User information section not found"
+        assert "token name:" not in missing, "Token information section not found"  
+        assert "scopes:" not in missing, "Scopes section not found"
         
         print("✅ Token enumeration output format validated on self-hosted")
 
-    def test_selfhosted_environment_behavior(self, gitlab_url, alice_token):
+    def test_selfhosted_environment_behavior(self, gitlab_url, alice_token_result):
         """Test that self-hosted environment-specific behavior works correctly."""
-        result = run_glato(["-u", gitlab_url, "--enumerate-token"], token=alice_token)
+        result = alice_token_result
         
         assert result.returncode == 0, "Token enumeration should succeed"
         assert "gitlab.com" not in gitlab_url.lower(), "Should be testing against self-hosted GitLab"
@@ -24,6 +24,11 @@ from ..models.user import *
 from ..models.runner import *
 
 
+def is_saas_url(url: str) -> bool:
+    """Check if a GitLab URL points at GitLab SaaS (gitlab.com)"""
+    return 'gitlab.com' in url.lower()
+
+
 class Enumerator:
     """Class holding all high level logic for enumerating GitLab, whether it is
     a user's entire access, individual groups, or repositories.
@@ -67,7 +72,7 @@ class Enumerator:
     def _is_gitlab_saas(self) -> bool:
         """Check if the GitLab instance is SaaS (gitlab.com)"""
         if hasattr(self.api, 'gitlab_url'):
-            return 'gitlab.com' in self.api.gitlab_url.lower()
+            return is_saas_url(self.api.gitlab_url)
         return False
 
     def enumerate_groups(
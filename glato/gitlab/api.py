@@ -196,6 +196,20 @@ class Api():
             return content
         return None
 
+    def prime_file_cache(self, project_id: int, path: str, content: str,
+                         ref: str = 'main'):
+        """Store file content fetched elsewhere so get_file_content() reuses it
+
+        Args:
+            project_id: ID of the project the file belongs to
+            path: Path of the file in the repository
+            content: Raw file content
+            ref: Branch/tag the content was read from; must match the ref
+                later passed to get_file_content()
+        """
+        cache_key = self._make_cache_key('file', project_id, path, ref)
+        self._cache['files'][cache_key] = content
+
     def check_if_file_exists(self, project_id, path, branch_name):
 
         res = self._call_get(
@@ -9,6 +9,40 @@ import os
 import re
 
 
+# Use the libyaml-backed loader when PyYAML was built with it; the
+# pure-Python SafeLoader produces the same results, only slower
+SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def _reference_constructor(loader, node):
+    """Handle !reference tags
+    e.g., !reference [.docker-image, script]"""
+    if isinstance(node, yaml.SequenceNode):
+        value = loader.construct_sequence(node)
+        return value
+    return loader.construct_scalar(node)
+
+
+def _include_constructor(loader, node):
+    """Handle !include tags"""
+    if isinstance(node, yaml.ScalarNode):
+        value = loader.construct_scalar(node)
+        return value
+    return None
+
+
+class GitLabCILoader(SafeLoader):
+    """Custom loader for GitLab CI YAML"""
+    pass
+
+
+# Only handle tags we explicitly know about
+for _tag, _constructor in {
+        '!reference': _reference_constructor,
+        '!include': _include_constructor}.items():
+    GitLabCILoader.add_constructor(_tag, _constructor)
+
+
 @dataclass
 class IncludeRule:
     """Represents a rule for when to include a file"""
@@ -252,41 +286,13 @@ class WorkflowSecretParser:
         """Parse workflow YAML with proper error handling and GitLab tag support"""
         from ..gitlab.secrets import Secrets
         try:
-            class GitLabCILoader(yaml.SafeLoader):
-                """Custom loader for GitLab CI YAML"""
-                pass
-
-            def reference_constructor(loader, node):
-                """Handle !reference tags
-                e.g., !reference [.docker-image, script]"""
-                if isinstance(node, yaml.SequenceNode):
-                    value = loader.construct_sequence(node)
-                    return value
-                return loader.construct_scalar(node)
-
-            def include_constructor(loader, node):
-                """Handle !include tags"""
-                if isinstance(node, yaml.ScalarNode):
-                    value = loader.construct_scalar(node)
-                    return value
-                return None
-
-            # Only handle tags we explicitly know about
-            known_tags = {
-                '!reference': reference_constructor,
-                '!include': include_constructor
-            }
-
-            for tag, constructor in known_tags.items():
-                GitLabCILoader.add_constructor(tag, constructor)
-
             # Parse YAML with custom loader
             try:
                 parsed = yaml.load(content, Loader=GitLabCILoader)
             except yaml.constructor.ConstructorError as e:
                 print(f"Unknown YAML tag encountered: {e}")
                 # Fallback to ignoring unknown tags if needed
-                parsed = yaml.load(content, Loader=yaml.SafeLoader)
+                parsed = yaml.load(content, Loader=SafeLoader)
 
             if not parsed:
                 return {}
@@ -300,7 +306,8 @@ class WorkflowSecretParser:
                         template_content = Secrets.get_template_content(
                             self.api, inc.path)
                         if template_content:
-                            template_yaml = yaml.safe_load(template_content)
+                            template_yaml = yaml.load(
+                                template_content, Loader=SafeLoader)
                             if template_yaml and isinstance(
                                     template_yaml, dict):
                                 template_jobs.update(template_yaml)
@@ -0,0 +1,39 @@
+"""Unit tests for the GitLab API client's file cache"""
+
+import unittest
+from unittest.mock import patch
+
+from glato.gitlab.api import Api
+
+
+class TestApiFileCache(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.api = Api(pat='glpat-test', gitlab_url='https://gitlab.example.com')
+
+    def test_primed_file_is_served_without_a_request(self):
+        """Test that get_file_content() returns primed content from the cache"""
+        self.api.prime_file_cache(42, '.gitlab-ci.yml', 'stages: [test]\n')
+
+        with patch.object(self.api, '_call_get') as call_get:
+            content = self.api.get_file_content(42, '.gitlab-ci.yml')
+
+        self.assertEqual(content, 'stages: [test]\n')
+        call_get.assert_not_called()
+
+    def test_primed_file_is_keyed_by_ref(self):
+        """Test that content primed for one ref is not served for another"""
+        self.api.prime_file_cache(42, '.gitlab-ci.yml', 'stages: [test]\n', ref='develop')
+
+        with patch.object(self.api, '_call_get', return_value=None) as call_get:
+            self.assertIsNone(self.api.get_file_content(42, '.gitlab-ci.yml'))
+            self.assertEqual(
+                self.api.get_file_content(42, '.gitlab-ci.yml', ref='develop'),
+                'stages: [test]\n')
+
+        call_get.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
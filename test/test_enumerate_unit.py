@@ -0,0 +1,30 @@
+"""Unit tests for GitLab SaaS URL detection"""
+
+import unittest
+from glato.enumerate.enumerate import is_saas_url
+
+
+class TestIsSaasUrl(unittest.TestCase):
+
+    def test_gitlab_com(self):
+        """Test that gitlab.com is detected as SaaS"""
+        self.assertTrue(is_saas_url('https://gitlab.com'))
+        self.assertTrue(is_saas_url('https://GitLab.com'))
+
+    def test_gitlab_com_subdomain(self):
+        """Test that a gitlab.com subdomain is detected as SaaS"""
+        self.assertTrue(is_saas_url('https://staging.gitlab.com'))
+
+    def test_gitlab_com_with_trailing_slash_and_path(self):
+        """Test that a trailing slash or path does not affect detection"""
+        self.assertTrue(is_saas_url('https://gitlab.com/'))
+        self.assertTrue(is_saas_url('https://gitlab.com/api/v4'))
+
+    def test_self_hosted_host(self):
+        """Test that self-hosted instances are not detected as SaaS"""
+        self.assertFalse(is_saas_url('https://gitlab.example.com'))
+        self.assertFalse(is_saas_url('http://10.0.0.5:8080/'))
+
+
+if __name__ == '__main__':
+    unittest.main()
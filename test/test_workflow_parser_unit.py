@@ -276,6 +276,23 @@ class TestWorkflowRunnerParsing(unittest.TestCase):
         self.assertIn('job_tags', tags_by_context)
         self.assertIn('static-tag', tags_by_context['job_tags'])
 
+    def test_parse_workflow_yaml_reference_tags(self):
+        """Test that !reference and !include tags parse with the module loader"""
+        content = (
+            ".setup:\n"
+            "  script: ['echo setup']\n"
+            "build_job:\n"
+            "  script: !reference [.setup, script]\n"
+            "  tags: ['docker']\n"
+            "extra: !include other.yml\n"
+        )
+        
+        parsed = self.parser.parse_workflow_yaml(content)
+        
+        self.assertEqual(parsed['build_job']['script'], ['.setup', 'script'])
+        self.assertEqual(parsed['build_job']['tags'], ['docker'])
+        self.assertEqual(parsed['extra'], 'other.yml')
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file